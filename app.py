@@ -1,16 +1,24 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, send_from_directory, abort
 from flask_apscheduler import APScheduler
 from datetime import datetime
 import logging
 import asyncio
 import os
+import time
+import json
+import hashlib
+from collections import deque
 from tasks.baltics import main as baltics_main
 from tasks.euronext import main as euronext_main
 from tasks.omx import main as omx_main
-from tasks.omx import clean as clean_main
-from tasks.omx import enrich as enrich_main
-from utils.db_util import create_tables
+from tasks.enrich_content import main as enrich_main
+from tasks.maintenance import main as maintenance_main
+from tasks.render_audio import main as audio_main
+from utils.db_util import create_tables, query_news, remove_duplicate_news as clean_main, NEWS_API_COLUMNS
+from utils.cache_util import TTLCache
+from utils.schedule_util import next_run
+from utils import metrics_util, event_util, profile_util
 
 app = Flask(__name__)
 scheduler = APScheduler()
@@ -23,49 +31,110 @@ logger = logging.getLogger(__name__)
 # Ensure database tables are created
 create_tables()
 
-# Store run history
-run_history = []
+# Store run history, keeping only the most recent entries
+RUN_HISTORY_SIZE = 500
+run_history = deque(maxlen=RUN_HISTORY_SIZE)
+
+# Cache news API responses briefly; cleared whenever a task finishes writing
+NEWS_CACHE_TTL = int(os.environ.get('NEWS_CACHE_TTL', 30))
+NEWS_API_MAX_LIMIT = 500
+news_cache = TTLCache(NEWS_CACHE_TTL)
+
+# Scraper tasks are polled on an adaptive, market-hours-aware schedule; their frequency then acts
+# as the longest allowed gap between polls during trading hours (closed markets use max_minutes)
+ADAPTIVE_SCHEDULING = os.environ.get('ADAPTIVE_SCHEDULING', 'true').lower() == 'true'
 
 # Store task statuses and frequencies
 task_info = {
-    'baltics': {'status': 'Not run', 'frequency': 6},
-    'euronext': {'status': 'Not run', 'frequency': 1},
-    'omx': {'status': 'Not run', 'frequency': 1},
+    'baltics': {'status': 'Not run', 'frequency': 6, 'adaptive': ADAPTIVE_SCHEDULING},
+    'euronext': {'status': 'Not run', 'frequency': 1, 'adaptive': ADAPTIVE_SCHEDULING},
+    'omx': {'status': 'Not run', 'frequency': 1, 'adaptive': ADAPTIVE_SCHEDULING},
     'clean': {'status': 'Not run', 'frequency': 2},
-    'enrich': {'status': 'Not run', 'frequency': 2}
+    'enrich': {'status': 'Not run', 'frequency': 2},
+    'audio': {'status': 'Not run', 'frequency': 12},
+    'maintenance': {'status': 'Not run', 'frequency': 12}
+}
+
+task_functions = {
+    'baltics': baltics_main,
+    'euronext': euronext_main,
+    'omx': omx_main,
+    'clean': clean_main,
+    'enrich': enrich_main,
+    'audio': audio_main,
+    'maintenance': maintenance_main
 }
 
+# Tasks started as soon as another completes, so they pick up its output right away; audio
+# reads the summaries enrich writes, and its own (longer) schedule only catches up on missed runs
+TASK_FOLLOWUPS = {'enrich': 'audio'}
+
+# Dashboard state changes go through these so they are also pushed to /events
+def set_task_status(task_name, status):
+    task_info[task_name]['status'] = status
+    event_util.publish('task', {'task': task_name, **task_info[task_name]})
+
+def add_log(message):
+    run_history.append(message)
+    event_util.publish('log', {'message': message})
+
 def run_task(task_name, task_func):
-    logger.info(f"Running {task_name} task at {datetime.now()}")
-    task_info[task_name]['status'] = 'Running'
+    started_at = datetime.now()
+    start = time.perf_counter()
+    logger.info(f"Running {task_name} task at {started_at}")
+    set_task_status(task_name, 'Running')
+    with metrics_util.task_context(task_name):
+        try:
+            with profile_util.profile_run(task_name) as profiler, metrics_util.timer('run'):
+                if task_name in ['euronext', 'omx']:
+                    asyncio.run(profiler.wrap(task_func()))
+                else:
+                    task_func()
+            add_log(f"{task_name} task completed successfully at {datetime.now()}")
+            set_task_status(task_name, 'Completed')
+            metrics_util.record_run(task_name, 'Completed', started_at, time.perf_counter() - start)
+            queue_followup(task_name)
+        except Exception as e:
+            error_message = f"Error in {task_name} task at {datetime.now()}: {str(e)}"
+            logger.error(error_message)
+            add_log(error_message)
+            set_task_status(task_name, 'Failed')
+            metrics_util.record_run(task_name, 'Failed', started_at, time.perf_counter() - start, str(e))
+        news_cache.clear()
+
+def queue_followup(task_name):
+    followup = TASK_FOLLOWUPS.get(task_name)
+    if followup and scheduler.running:
+        # Run on the scheduler's executor rather than blocking the task (or request) that finished
+        scheduler.add_job(id=f'{followup}_followup', func=run_task, trigger='date', args=[followup, task_functions[followup]],
+                          replace_existing=True, misfire_grace_time=None)
+
+# Adaptive tasks run once at the chosen time and pick their next run afterwards
+def run_adaptive_task(task_name, task_func):
     try:
-        if task_name in ['euronext', 'omx']:
-            asyncio.run(task_func())
-        else:
-            task_func()
-        run_history.append(f"{task_name} task completed successfully at {datetime.now()}")
-        task_info[task_name]['status'] = 'Completed'
-    except Exception as e:
-        error_message = f"Error in {task_name} task at {datetime.now()}: {str(e)}"
-        logger.error(error_message)
-        run_history.append(error_message)
-        task_info[task_name]['status'] = 'Failed'
+        run_task(task_name, task_func)
+    finally:
+        schedule_task(task_name, task_func, task_info[task_name]['frequency'])
 
 def schedule_task(task_name, task_func, frequency):
     job_id = f'{task_name}_task'
     if scheduler.get_job(job_id):
         scheduler.remove_job(job_id)
+    if task_info[task_name].get('adaptive'):
+        run_at, reason = next_run(task_name, max_hours=frequency)
+        task_info[task_name]['next_run'] = run_at.isoformat()
+        task_info[task_name]['schedule_reason'] = reason
+        # A one-shot job is the only thing that schedules the next poll, so a late one must still run
+        # (after a stop/start, a busy executor or the host sleeping) rather than be dropped as misfired
+        scheduler.add_job(id=job_id, func=run_adaptive_task, trigger='date', run_date=run_at, args=[task_name, task_func],
+                          misfire_grace_time=None, coalesce=True)
+        logger.info(f"Scheduled {task_name} task for {run_at:%Y-%m-%d %H:%M} UTC ({reason})")
+        event_util.publish('task', {'task': task_name, **task_info[task_name]})
+        return
     scheduler.add_job(id=job_id, func=run_task, trigger='interval', hours=frequency, args=[task_name, task_func])
     logger.info(f"Scheduled {task_name} task to run every {frequency} hours")
 
 def init_schedules():
-    task_functions = {
-        'baltics': baltics_main,
-        'euronext': euronext_main,
-        'omx': omx_main,
-        'clean': clean_main,
-        'enrich': enrich_main
-    }
     for task_name, info in task_info.items():
         schedule_task(task_name, task_functions[task_name], info['frequency'])
 
@@ -78,6 +147,7 @@ def start_scheduler():
     if not scheduler.running:
         scheduler.start()
         logger.info("Scheduler started")
+        event_util.publish('scheduler', {'status': 'Running'})
     return jsonify({"status": "Scheduler started"})
 
 @app.route('/stop', methods=['POST'])
@@ -85,17 +155,15 @@ def stop_scheduler():
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler stopped")
+        event_util.publish('scheduler', {'status': 'Stopped'})
     return jsonify({"status": "Scheduler stopped"})
 
 @app.route('/run_task/<task_name>', methods=['POST'])
 def run_task_manually(task_name):
-    task_functions = {
-        'baltics': baltics_main,
-        'euronext': euronext_main,
-        'omx': omx_main
-    }
     if task_name in task_functions:
         run_task(task_name, task_functions[task_name])
+        if task_info[task_name].get('adaptive'):
+            schedule_task(task_name, task_functions[task_name], task_info[task_name]['frequency'])
         return jsonify({"status": f"{task_name} task executed"})
     else:
         return jsonify({"status": "Invalid task name"}), 400
@@ -104,17 +172,60 @@ def run_task_manually(task_name):
 def set_task_frequency(task_name):
     frequency = int(request.form['frequency'])
     task_info[task_name]['frequency'] = frequency
-    task_functions = {
-        'baltics': baltics_main,
-        'euronext': euronext_main,
-        'omx': omx_main
-    }
     schedule_task(task_name, task_functions[task_name], frequency)
+    event_util.publish('task', {'task': task_name, **task_info[task_name]})
     return jsonify({"status": f"{task_name} frequency set to {frequency} hours"})
 
 @app.route('/get_logs')
 def get_logs():
-    return jsonify({"logs": run_history})
+    return jsonify({"logs": list(run_history)})
+
+# How long /events waits for new events before sending a keep-alive comment
+EVENTS_KEEPALIVE = 15
+SNAPSHOT_LOG_LINES = 50
+# A stream ends after EVENTS_STREAM_SECONDS and the browser reconnects with Last-Event-ID;
+# at most EVENTS_MAX_STREAMS are open at once so dashboards can't take every worker thread
+EVENTS_STREAM_SECONDS = int(os.environ.get('EVENTS_STREAM_SECONDS', 300))
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 4))
+EVENTS_RETRY_MS = 3000
+
+@app.route('/events')
+def events():
+    # Resume from Last-Event-ID (sent by EventSource on reconnect) or ?since=
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    if not event_util.acquire_stream(EVENTS_MAX_STREAMS):
+        # The dashboard falls back to polling when the stream is refused
+        return Response("Too many open event streams", status=503, headers={'Retry-After': '60'})
+
+    def format_event(event_id, event_type, data):
+        return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+    def stream():
+        deadline = time.monotonic() + EVENTS_STREAM_SECONDS
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        cursor = last_id
+        if cursor is None or cursor > event_util.latest_id() or event_util.is_stale(cursor):
+            # New or too-far-behind clients start from a snapshot instead of replaying history
+            cursor = event_util.latest_id()
+            yield format_event(cursor, 'snapshot', {
+                'tasks': task_info,
+                'scheduler': "Running" if scheduler.running else "Stopped",
+                'logs': list(run_history)[-SNAPSHOT_LOG_LINES:],
+            })
+        while time.monotonic() < deadline:
+            pending = event_util.wait_for_events(cursor, min(EVENTS_KEEPALIVE, deadline - time.monotonic()))
+            if not pending:
+                yield ": keep-alive\n\n"
+                continue
+            for event in pending:
+                cursor = event['id']
+                yield format_event(event['id'], event['type'], event['data'])
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(event_util.release_stream)
+    return response
 
 @app.route('/scheduler_status')
 def scheduler_status():
@@ -123,8 +234,70 @@ def scheduler_status():
 
 @app.route('/task_info')
 def get_task_info():
+    # Per-stage timings and recent runs are only included when asked for
+    if request.args.get('metrics'):
+        return jsonify({name: {**info, 'metrics': metrics_util.task_summary(name)} for name, info in task_info.items()})
     return jsonify(task_info)
 
+@app.route('/news')
+def get_news():
+    args = request.args
+    columns = args.get('columns')
+    columns = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+    if columns and any(c not in NEWS_API_COLUMNS for c in columns):
+        return jsonify({"status": f"Invalid columns, choose from: {', '.join(NEWS_API_COLUMNS)}"}), 400
+    try:
+        limit = min(int(args.get('limit', 50)), NEWS_API_MAX_LIMIT)
+        date_from = datetime.fromisoformat(args['from']) if args.get('from') else None
+        date_to = datetime.fromisoformat(args['to']) if args.get('to') else None
+    except ValueError as e:
+        return jsonify({"status": f"Invalid parameter: {e}"}), 400
+    if limit < 1:
+        return jsonify({"status": "limit must be positive"}), 400
+
+    cache_key = (args.get('publisher'), args.get('company'), args.get('ai_topic'), date_from, date_to,
+                 tuple(columns or ()), args.get('cursor'), limit)
+    cached = news_cache.get(cache_key)
+    if cached is None:
+        try:
+            items, next_cursor = query_news(
+                publisher=args.get('publisher'), company=args.get('company'), ai_topic=args.get('ai_topic'),
+                date_from=date_from, date_to=date_to, columns=columns, cursor=args.get('cursor'), limit=limit
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({"status": f"Invalid cursor: {e}"}), 400
+        body = json.dumps({"news": items, "next_cursor": next_cursor})
+        cached = (hashlib.sha1(body.encode('utf-8')).hexdigest(), body)
+        news_cache.set(cache_key, cached)
+
+    etag, body = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.max_age = NEWS_CACHE_TTL
+    return response.make_conditional(request)
+
+# Profile the next run of a task, whether scheduled or manual
+@app.route('/profile/<task_name>', methods=['POST'])
+def profile_task(task_name):
+    if task_name not in task_functions:
+        return jsonify({"status": "Invalid task name"}), 400
+    profile_util.arm(task_name)
+    return jsonify({"status": f"Next {task_name} run will be profiled"})
+
+@app.route('/profiles')
+def list_profiles():
+    return jsonify({"profiles": profile_util.list_profiles()})
+
+@app.route('/profiles/<name>')
+def download_profile(name):
+    if not name.endswith(profile_util.PROFILE_EXTENSIONS):
+        abort(404)
+    return send_from_directory(os.path.abspath(profile_util.PROFILE_DIR), name, as_attachment=True)
+
+@app.route('/metrics')
+def metrics():
+    return Response(metrics_util.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     init_schedules()
     scheduler.start()
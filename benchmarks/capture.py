@@ -0,0 +1,85 @@
+import os
+import re
+import asyncio
+import logging
+import argparse
+import requests
+from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+from benchmarks.fixture_server import FIXTURES_DIR
+
+# Refresh the replayed fixtures from the live sites. Listing links are rewritten
+# to point at the fixture server and each linked article is saved under
+# fixtures/articles/<key>.html so the benchmark never leaves the machine.
+
+# Same sources the scrapers in tasks/ read from
+OMX_URL = 'https://www.nasdaqomxnordic.com/news/companynews'
+EURONEXT_URL = 'https://live.euronext.com/en/products/equities/company-news'
+EURONEXT_URL_PREFIX = 'https://live.euronext.com'
+BALTICS_RSS_URL = 'https://nasdaqbaltic.com/statistics/en/news?rss=1&num=100'
+
+def save(name, content):
+    with open(os.path.join(FIXTURES_DIR, name), 'w', encoding='utf-8') as f:
+        f.write(content)
+    logging.info(f"Saved fixture {name}")
+
+def save_article(key, url):
+    try:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logging.warning(f"Could not capture article {url}: {e}")
+        return
+    with open(os.path.join(FIXTURES_DIR, 'articles', f'{key}.html'), 'wb') as f:
+        f.write(response.content)
+
+async def page_html(url, selector):
+    async with async_playwright() as p:
+        browser = await p.firefox.launch(headless=True)
+        context = await browser.new_context(ignore_https_errors=True)
+        page = await context.new_page()
+        await page.goto(url)
+        await page.wait_for_selector(selector)
+        html = await page.content()
+        await browser.close()
+        return html
+
+def capture_listing(name, html, row_selector, link_column, prefix, href_prefix, url_prefix, articles):
+    soup = BeautifulSoup(html, 'html.parser')
+    for i, row in enumerate(soup.select(row_selector)):
+        columns = row.find_all('td')
+        anchor = columns[link_column].find('a') if len(columns) > link_column else None
+        if not anchor or not anchor.get('href'):
+            continue
+        key = f'{prefix}-{i}'
+        if i < articles:
+            save_article(key, url_prefix + anchor['href'])
+        anchor['href'] = f'{href_prefix}/article/{key}'
+    save(name, str(soup))
+
+def capture_baltics(articles):
+    response = requests.get(BALTICS_RSS_URL, timeout=30)
+    response.raise_for_status()
+    rss = response.text
+    links = re.findall(r'<link>(.*?)</link>', rss)[1:]
+    for i, link in enumerate(links):
+        key = f'baltics-{i}'
+        if i < articles:
+            save_article(key, link)
+        rss = rss.replace(f'<link>{link}</link>', f'<link>{{base_url}}/article/{key}</link>', 1)
+    save('baltics_rss.xml', rss)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Capture live listing pages and articles as benchmark fixtures')
+    parser.add_argument('--articles', type=int, default=20, help='articles to capture per source')
+    args = parser.parse_args()
+
+    omx_html = asyncio.run(page_html(OMX_URL, '#searchNewsTableId'))
+    capture_listing('omx.html', omx_html, '#searchNewsTableId tbody tr', 3, 'omx', '{base_url}', '', args.articles)
+    euronext_html = asyncio.run(page_html(EURONEXT_URL, 'table.table'))
+    capture_listing('euronext.html', euronext_html, 'table.table tbody tr', 2, 'euronext', '', EURONEXT_URL_PREFIX, args.articles)
+    capture_baltics(args.articles)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from utils.tag_util import tag_list
+
+# Local stand-in for every external service the tasks talk to:
+#   /omx/news, /euronext/news, /baltics/rss  -> replayed listing pages
+#   /article/<key>                            -> replayed article HTML (captured key or hashed onto one)
+#   /v1/chat/completions                      -> fake OpenAI-compatible endpoint
+#   /v1/text-to-speech/<voice_id>             -> fake ElevenLabs endpoint returning stub MP3 bytes
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+LISTINGS = {
+    '/omx/news': ('omx.html', 'text/html; charset=utf-8'),
+    '/euronext/news': ('euronext.html', 'text/html; charset=utf-8'),
+    '/baltics/rss': ('baltics_rss.xml', 'application/rss+xml; charset=utf-8'),
+}
+
+def load_articles():
+    articles_dir = os.path.join(FIXTURES_DIR, 'articles')
+    articles = {}
+    for name in sorted(os.listdir(articles_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(articles_dir, name), 'rb') as f:
+                articles[name[:-len('.html')]] = f.read()
+    return articles
+
+def fake_completion(prompt):
+    digest = int(hashlib.sha1(prompt.encode('utf-8')).hexdigest(), 16)
+    if prompt.startswith('Answering with one tag only') or 'pick up the best tag' in prompt:
+        return tag_list[digest % len(tag_list)]
+    if 'ticker' in prompt:
+        return 'N/A'
+    return "What a play! The company smashes expectations and the market roars as the numbers land right on target."
+
+# An ID3 header followed by filler frames, sized with the text so renders differ
+def fake_audio(text):
+    return b'ID3\x04\x00\x00\x00\x00\x00\x00' + b'\xff\xfb\x90\x00' * (len(text) + 1)
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = 'FinespressoFixtures/1.0'
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if self.server.fetch_latency:
+            time.sleep(self.server.fetch_latency)
+
+        if path in LISTINGS:
+            name, content_type = LISTINGS[path]
+            with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+                body = f.read().replace(b'{base_url}', self.server.base_url.encode('utf-8'))
+            self._send(200, body, content_type)
+        elif path.startswith('/article/'):
+            key = path[len('/article/'):]
+            if key.startswith('missing'):
+                self._send(404, b'Not found', 'text/plain')
+                return
+            articles = self.server.articles
+            if key not in articles:
+                # Any other key maps onto a fixture deterministically, so synthetic rows can use unique links
+                names = sorted(articles)
+                key = names[int(hashlib.sha1(key.encode('utf-8')).hexdigest(), 16) % len(names)]
+            self._send(200, articles[key], 'text/html; charset=utf-8')
+        else:
+            self._send(404, b'Not found', 'text/plain')
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        if path.endswith('/chat/completions'):
+            if self.server.llm_latency:
+                time.sleep(self.server.llm_latency)
+            prompt = payload['messages'][-1]['content']
+            content = fake_completion(prompt)
+            body = json.dumps({
+                'id': 'chatcmpl-fixture',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': payload.get('model', 'fixture'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': len(prompt.split()),
+                    'completion_tokens': len(content.split()),
+                    'total_tokens': len(prompt.split()) + len(content.split()),
+                },
+            }).encode('utf-8')
+            self._send(200, body, 'application/json')
+        elif path.startswith('/v1/text-to-speech/'):
+            if self.server.llm_latency:
+                time.sleep(self.server.llm_latency)
+            self._send(200, fake_audio(payload.get('text', '')), 'audio/mpeg')
+        else:
+            self._send(404, b'Not found', 'text/plain')
+
+def start_server(host='127.0.0.1', port=0, llm_latency=0.0, fetch_latency=0.0):
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    server.base_url = f'http://{host}:{server.server_address[1]}'
+    server.llm_latency = llm_latency
+    server.fetch_latency = fetch_latency
+    server.articles = load_articles()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logging.info(f"Fixture server listening on {server.base_url}")
+    return server
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Serve local fixtures for exchanges, articles and OpenAI')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='seconds added to every chat completion')
+    parser.add_argument('--fetch-latency', type=float, default=0.0, help='seconds added to every page fetch')
+    args = parser.parse_args()
+    server = start_server(port=args.port, llm_latency=args.llm_latency, fetch_latency=args.fetch_latency)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from benchmarks.fixture_server import start_server
+
+# End-to-end scenarios: scrape -> ingest -> clean -> enrich against local fixtures.
+#
+#   python -m benchmarks.run --rows 1000 10000 100000
+#   python -m benchmarks.run --rows 1000 --baseline benchmarks/results/<previous>.json
+#
+# Everything external is replaced: exchange pages and articles come from the
+# fixture server, OpenAI is the fake endpoint and the database is a throwaway
+# SQLite file unless --database-url points at a local Postgres.
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+PUBLISHERS = {
+    'omx': ["Company Announcement", "Financial Calendar", "Interim report (Q1 and Q3)", "Inside information",
+            "Notice to general meeting", "Changes in company's own shares"],
+    'euronext': ["Regulated information", "Annual financial and audit reports", "Press release",
+                 "Total number of voting rights and capital"],
+    'baltics': [''],
+}
+COMPANIES = ["Volvo AB", "Nokia Oyj", "Equinor ASA", "Novo Nordisk A/S", "Ericsson", "Sampo Oyj",
+             "LHV Group", "Tallinna Vesi", "Kesko Oyj", "Orsted A/S"]
+INDUSTRIES = ["Industrials", "Technology", "Energy", "Health Care", "Financials"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run reproducible end-to-end benchmarks against local fixtures')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--enrich-limit', type=int, default=500,
+                        help='max rows sent through fetch + LLM enrichment per scenario (0 for all)')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1)
+    parser.add_argument('--dead-link-ratio', type=float, default=0.02, help='share of rows whose article 404s')
+    parser.add_argument('--llm-latency', type=float, default=0.05)
+    parser.add_argument('--fetch-latency', type=float, default=0.0)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite database')
+    parser.add_argument('--browser', action='store_true', help='also run the Playwright OMX/Euronext scrapers')
+    parser.add_argument('--output', help='results file, defaults to benchmarks/results/<timestamp>.json')
+    parser.add_argument('--baseline', help='previous results file to compare throughput against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fractional throughput drop before a stage counts as a regression')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+def configure_environment(args, base_url):
+    # utils.* read these at import time, so they must be set before run_scenario imports them
+    if not args.database_url:
+        args.database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='finespresso-bench-'), 'bench.sqlite3')
+    os.environ['DATABASE_URL'] = args.database_url
+    # Never read from or write to the production page archive
+    os.environ['PAGE_ARCHIVE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='finespresso-bench-'), 'pages.sqlite3')
+    os.environ['OPENAI_BASE_URL'] = f'{base_url}/v1'
+    os.environ['OPENAI_API_KEY'] = 'fixture'
+
+def synthetic_news(rows, base_url, duplicate_ratio, dead_link_ratio, rng):
+    unique = max(1, int(rows * (1 - duplicate_ratio)))
+    now = datetime.now(timezone.utc)
+    data = []
+    for i in range(rows):
+        n = i if i < unique else rng.randrange(unique)
+        publisher = list(PUBLISHERS)[n % len(PUBLISHERS)]
+        article = f'missing-{n}' if rng.random() < dead_link_ratio else f'{publisher}-{n}'
+        data.append({
+            'title': f'{COMPANIES[n % len(COMPANIES)]}: release {n}',
+            'link': f'{base_url}/article/{article}',
+            'company': COMPANIES[n % len(COMPANIES)],
+            'published_date': now - timedelta(minutes=n),
+            'publisher_topic': PUBLISHERS[publisher][n % len(PUBLISHERS[publisher])],
+            'industry': INDUSTRIES[n % len(INDUSTRIES)] if publisher == 'euronext' else '',
+            'publisher': publisher,
+            'status': 'raw',
+        })
+    return pd.DataFrame(data)
+
+def stage_result(seconds, rows):
+    return {'seconds': round(seconds, 4), 'rows': rows, 'rows_per_second': round(rows / seconds, 2) if seconds > 0 else None}
+
+def run_scenario(rows, args, base_url, rng):
+    from utils import db_util, metrics_util, archive_util
+    from utils.enrich_util import enrich_content_from_url
+    from tasks import baltics, enrich_content
+
+    # Each scenario starts with an empty page archive, so fetches are never served from an earlier one
+    archive_util.ARCHIVE_PATH = os.path.join(tempfile.mkdtemp(prefix='finespresso-bench-'), 'pages.sqlite3')
+    db_util.Base.metadata.drop_all(db_util.engine)
+    db_util.create_tables()
+    stages = {}
+    task_name = f'bench_{rows}'
+
+    with metrics_util.task_context(task_name):
+        start = time.perf_counter()
+        scraped = baltics.parse_rss_feed(f'{base_url}/baltics/rss', None)
+        stages['scrape_baltics'] = stage_result(time.perf_counter() - start, len(scraped))
+
+        if args.browser:
+            from tasks import omx, euronext
+            omx.DEFAULT_URL = f'{base_url}/omx/news'
+            euronext.DEFAULT_URL = f'{base_url}/euronext/news'
+            euronext.URL_PREFIX = base_url
+            for name, scrape in [('scrape_omx', omx.scrape_nasdaq_news), ('scrape_euronext', euronext.scrape_euronext)]:
+                start = time.perf_counter()
+                scraped = asyncio.run(scrape())
+                stages[name] = stage_result(time.perf_counter() - start, len(scraped))
+
+        df = synthetic_news(rows, base_url, args.duplicate_ratio, args.dead_link_ratio, rng)
+        start = time.perf_counter()
+        news_items = []
+        for publisher, group in df.groupby('publisher'):
+            news_items.extend(db_util.map_to_db(group, publisher))
+        db_util.add_news_items(news_items)
+        stages['ingest'] = stage_result(time.perf_counter() - start, rows)
+
+        start = time.perf_counter()
+        deleted, updated = db_util.remove_duplicate_news()
+        stages['clean'] = stage_result(time.perf_counter() - start, rows)
+        stages['clean']['deleted'] = deleted
+
+        start = time.perf_counter()
+        pending = enrich_content.get_news_without_content()
+        if args.enrich_limit:
+            pending = pending[:args.enrich_limit]
+        news_df = enrich_content.news_to_dataframe(pending)
+        failed = 0
+        if not news_df.empty:
+            enriched = enrich_content_from_url(news_df)
+            failed = int(enriched['enrich_error'].notna().sum())
+            enrich_content.update_enriched_news(enriched)
+        # Throughput only counts rows that were enriched, so a rise in errors can't pass for a speedup
+        stages['enrich'] = stage_result(time.perf_counter() - start, len(news_df) - failed)
+        stages['enrich']['attempted'] = len(news_df)
+        stages['enrich']['failed'] = failed
+
+    return {'rows': rows, 'stages': stages, 'metrics': metrics_util.task_summary(task_name)}
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(s['rows'], name): stage for s in baseline['scenarios'] for name, stage in s['stages'].items()}
+    regressions = []
+    for scenario in results['scenarios']:
+        for name, stage in scenario['stages'].items():
+            before = previous.get((scenario['rows'], name))
+            if not before or not before.get('rows_per_second') or not stage.get('rows_per_second'):
+                continue
+            change = stage['rows_per_second'] / before['rows_per_second'] - 1
+            stage['change_vs_baseline'] = round(change, 4)
+            if change < -tolerance:
+                regressions.append(f"{name} @ {scenario['rows']} rows: {before['rows_per_second']} -> {stage['rows_per_second']} rows/s ({change:.0%})")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    rng = random.Random(args.seed)
+    server = start_server(llm_latency=args.llm_latency, fetch_latency=args.fetch_latency)
+    configure_environment(args, server.base_url)
+
+    started_at = datetime.now(timezone.utc)
+    results = {
+        'started_at': started_at.isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'scenarios': [],
+    }
+    try:
+        for rows in args.rows:
+            scenario = run_scenario(rows, args, server.base_url, rng)
+            results['scenarios'].append(scenario)
+            summary = ', '.join(f"{name} {stage['rows_per_second']} rows/s" for name, stage in scenario['stages'].items())
+            print(f"{rows} rows: {summary}")
+    finally:
+        server.shutdown()
+
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    results['regressions'] = regressions
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results written to {output}")
+
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
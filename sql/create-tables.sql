@@ -3,5 +3,7 @@ CREATE TABLE company (
     yf_ticker VARCHAR(255),
     mw_ticker VARCHAR(255),
     yf_url VARCHAR(255),
-    mw_url VARCHAR(255)
-);
\ No newline at end of file
+    mw_url VARCHAR(255),
+    name VARCHAR(255),
+    aliases TEXT
+);
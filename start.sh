@@ -1,2 +1,2 @@
 #!/bin/bash
-gunicorn app:app -b 0.0.0.0:$PORT
\ No newline at end of file
+gunicorn app:app -b 0.0.0.0:$PORT --worker-class gthread --threads 16
\ No newline at end of file
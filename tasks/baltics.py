@@ -9,6 +9,8 @@ from utils.openai_util import summarize, tag_news
 from utils.db_util import create_tables, add_news_items, map_to_db
 from utils.tag_util import tags
 from utils.web_util import fetch_url_content
+from utils.metrics_util import timer, inc
+from utils.company_util import resolve_tickers
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,7 +26,8 @@ def parse_date(date_string):
 def parse_rss_feed(url, tags):
     logging.info(f"Parsing RSS feed from: {url}")
     try:
-        feed = feedparser.parse(url) 
+        with timer('fetch'):
+            feed = feedparser.parse(url)
     except Exception as e:
         logging.error(f"Error parsing RSS feed: {e}")
         return pd.DataFrame()
@@ -34,27 +37,29 @@ def parse_rss_feed(url, tags):
 
     data = []
 
-    for index, item in enumerate(items, 1):
-        logging.debug(f"Processing item {index}/{len(items)}: {item.title}")
-        
-        title = item.title
-        link = item.link
-        pub_date = parse_date(item.published)
-        company = item.get('issuer', 'N/A')
-        data.append({
-            'title': title,
-            'link': link,
-            'company': company,
-            'published_date': pub_date,
-            'publisher': 'baltics',
-            'industry': '',
-            'publisher_topic': '',
-            'status': 'raw'
-        })
-
-        logging.debug(f"Added news item to dataframe: {title}")
+    with timer('parse'):
+        for index, item in enumerate(items, 1):
+            logging.debug(f"Processing item {index}/{len(items)}: {item.title}")
+
+            title = item.title
+            link = item.link
+            pub_date = parse_date(item.published)
+            company = item.get('issuer', 'N/A')
+            data.append({
+                'title': title,
+                'link': link,
+                'company': company,
+                'published_date': pub_date,
+                'publisher': 'baltics',
+                'industry': '',
+                'publisher_topic': '',
+                'status': 'raw'
+            })
+
+            logging.debug(f"Added news item to dataframe: {title}")
 
     df = pd.DataFrame(data)
+    inc('items_scraped', len(df))
     logging.info(f"Created dataframe with {len(df)} rows")
     return df
 
@@ -74,6 +79,8 @@ def main():
         logging.info("Fetching and parsing news items")
         news_df = parse_rss_feed(rss_url, tags)
         logging.info(f"Created dataframe with {len(news_df)} rows")
+        news_df = resolve_tickers(news_df)
+
         # Map dataframe to News objects
         news_items = map_to_db(news_df, 'baltics')
 
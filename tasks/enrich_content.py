@@ -1,7 +1,9 @@
 import logging
 from sqlalchemy import select
-from utils.db_util import Session, News, engine
+from utils.db_util import Session, News, engine, enrich_eligible, record_enrich_failure, record_enrich_success, \
+    downloaded_within, ENRICH_LOOKBACK_DAYS, ENRICH_CONTENT
 from utils.enrich_util import enrich_content_from_url
+from utils.metrics_util import timer
 import pandas as pd
 import time
 
@@ -11,9 +13,10 @@ def get_news_without_content():
     logging.info("Retrieving news items without content from database")
     session = Session()
     try:
-        query = select(News).where(News.content.is_(None))
-        result = session.execute(query)
-        news_items = result.scalars().all()
+        query = select(News).where(News.content.is_(None), enrich_eligible(ENRICH_CONTENT), downloaded_within(ENRICH_LOOKBACK_DAYS))
+        with timer('db_read'):
+            result = session.execute(query)
+            news_items = result.scalars().all()
         logging.info(f"Retrieved {len(news_items)} news items without content")
         return news_items
     finally:
@@ -26,6 +29,8 @@ def news_to_dataframe(news_items):
             'id': item.id,
             'title': item.title,
             'link': item.link,
+            'publisher': item.publisher,
+            'ai_topic': item.ai_topic,
             'status': item.status
         } for item in news_items
     ])
@@ -37,16 +42,20 @@ def update_enriched_news(enriched_df):
     session = Session()
     try:
         updated_count = 0
-        for _, row in enriched_df.iterrows():
-            news_item = session.query(News).get(row['id'])
-            if news_item:
-                news_item.content = row['content']
-                news_item.ai_summary = row['ai_summary']
-                news_item.ai_topic = row['ai_topic']
-                if news_item.status != 'fully_enriched':
-                    news_item.status = 'content_enriched'
-                updated_count += 1
-        session.commit()
+        with timer('db_write'):
+            for _, row in enriched_df.iterrows():
+                news_item = session.query(News).get(row['id'])
+                if news_item and pd.notna(row['enrich_error']):
+                    record_enrich_failure(session, news_item.id, ENRICH_CONTENT, row['enrich_error'], row['enrich_permanent'])
+                elif news_item:
+                    record_enrich_success(session, news_item.id, ENRICH_CONTENT)
+                    news_item.content = row['content']
+                    news_item.ai_summary = row['ai_summary']
+                    news_item.ai_topic = row['ai_topic']
+                    if news_item.status != 'fully_enriched':
+                        news_item.status = 'content_enriched'
+                    updated_count += 1
+            session.commit()
         logging.info(f"Updated {updated_count} news items with enriched content")
     except Exception as e:
         logging.error(f"Error updating enriched news: {e}")
@@ -1,7 +1,9 @@
 import logging
 from sqlalchemy import select
-from utils.db_util import Session, News
+from utils.db_util import Session, News, enrich_eligible, record_enrich_failure, record_enrich_success, \
+    downloaded_within, ENRICH_LOOKBACK_DAYS, ENRICH_SUMMARY
 from utils.enrich_util import enrich_from_url
+from utils.metrics_util import timer
 import pandas as pd
 import time
 
@@ -11,27 +13,32 @@ def get_news_without_summary():
     logging.info("Retrieving news items without summaries from database")
     session = Session()
     try:
-        query = select(News).where(News.ai_summary.is_(None))
-        result = session.execute(query)
-        news_items = result.scalars().all()
+        query = select(News).where(News.ai_summary.is_(None), enrich_eligible(ENRICH_SUMMARY), downloaded_within(ENRICH_LOOKBACK_DAYS))
+        with timer('db_read'):
+            result = session.execute(query)
+            news_items = result.scalars().all()
         logging.info(f"Retrieved {len(news_items)} news items without summaries")
         return news_items
     finally:
         session.close()
 
 def news_to_dataframe(news_items):
-    return pd.DataFrame([{'id': item.id, 'link': item.link} for item in news_items])
+    return pd.DataFrame([{'id': item.id, 'link': item.link, 'publisher': item.publisher} for item in news_items])
 
 def update_summaries(enriched_df):
     session = Session()
     try:
         updated_count = 0
-        for _, row in enriched_df.iterrows():
-            news_item = session.get(News, row['id'])
-            if news_item and 'ai_summary' in row:
-                news_item.ai_summary = row['ai_summary']
-                updated_count += 1
-        session.commit()
+        with timer('db_write'):
+            for _, row in enriched_df.iterrows():
+                news_item = session.get(News, row['id'])
+                if news_item and pd.notna(row['enrich_error']):
+                    record_enrich_failure(session, news_item.id, ENRICH_SUMMARY, row['enrich_error'], row['enrich_permanent'])
+                elif news_item and 'ai_summary' in row:
+                    record_enrich_success(session, news_item.id, ENRICH_SUMMARY)
+                    news_item.ai_summary = row['ai_summary']
+                    updated_count += 1
+            session.commit()
         logging.info(f"Updated {updated_count} news items with summaries")
     except Exception as e:
         logging.error(f"Error updating summaries: {str(e)}")
@@ -1,7 +1,9 @@
 import logging
 from sqlalchemy import select
-from utils.db_util import Session, News
+from utils.db_util import Session, News, enrich_eligible, record_enrich_failure, record_enrich_success, \
+    downloaded_within, ENRICH_LOOKBACK_DAYS, ENRICH_TAG
 from utils.enrich_util import enrich_tag_from_url
+from utils.metrics_util import timer
 import pandas as pd
 import time
 
@@ -13,9 +15,10 @@ def get_news_without_tags():
     logging.info("Retrieving news items without AI topics from database")
     session = Session()
     try:
-        query = select(News).where(News.ai_topic.is_(None))
-        result = session.execute(query)
-        news_items = result.scalars().all()
+        query = select(News).where(News.ai_topic.is_(None), enrich_eligible(ENRICH_TAG), downloaded_within(ENRICH_LOOKBACK_DAYS))
+        with timer('db_read'):
+            result = session.execute(query)
+            news_items = result.scalars().all()
         count = len(news_items)
         print(f"Retrieved {count} news items without AI topics")
         logging.info(f"Retrieved {count} news items without AI topics")
@@ -26,7 +29,7 @@ def get_news_without_tags():
 def news_to_dataframe(news_items):
     print("Converting news items to DataFrame...")
     logging.info("Converting news items to DataFrame")
-    df = pd.DataFrame([{'id': item.id, 'link': item.link} for item in news_items])
+    df = pd.DataFrame([{'id': item.id, 'link': item.link, 'publisher': item.publisher} for item in news_items])
     print(f"Created DataFrame with {len(df)} rows")
     logging.info(f"Created DataFrame with {len(df)} rows")
     return df
@@ -38,17 +41,21 @@ def update_tags(enriched_df):
     try:
         updated_count = 0
         total_items = len(enriched_df)
-        for index, row in enriched_df.iterrows():
-            news_item = session.get(News, row['id'])
-            if news_item and 'ai_topic' in row:
-                news_item.ai_topic = row['ai_topic']
-                updated_count += 1
-            
-            if (index + 1) % 10 == 0 or index == total_items - 1:
-                print(f"Updated {index + 1}/{total_items} items")
-                logging.info(f"Updated {index + 1}/{total_items} items")
-        
-        session.commit()
+        with timer('db_write'):
+            for index, row in enriched_df.iterrows():
+                news_item = session.get(News, row['id'])
+                if news_item and pd.notna(row['enrich_error']):
+                    record_enrich_failure(session, news_item.id, ENRICH_TAG, row['enrich_error'], row['enrich_permanent'])
+                elif news_item and 'ai_topic' in row:
+                    record_enrich_success(session, news_item.id, ENRICH_TAG)
+                    news_item.ai_topic = row['ai_topic']
+                    updated_count += 1
+
+                if (index + 1) % 10 == 0 or index == total_items - 1:
+                    print(f"Updated {index + 1}/{total_items} items")
+                    logging.info(f"Updated {index + 1}/{total_items} items")
+
+            session.commit()
         print(f"Successfully updated {updated_count} news items with tags")
         logging.info(f"Successfully updated {updated_count} news items with tags")
     except Exception as e:
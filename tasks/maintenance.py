@@ -0,0 +1,65 @@
+import os
+import sys
+import logging
+import time
+import pandas as pd
+from datetime import datetime, timezone
+from utils.db_util import engine, News, NEWS_PARTITION_KEY, NEWS_PARTITIONS_AHEAD, create_tables, prune_enrich_state, \
+    seed_company_names
+from utils.schema_util import (supports_partitioning, is_partitioned, ensure_partitions, detach_old_partitions, archive_old_rows,
+                               convert_to_partitioned, month_start)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Months of news kept in the live table; older data is detached (or dropped) each run. 0 keeps everything.
+NEWS_RETENTION_MONTHS = int(os.getenv('NEWS_RETENTION_MONTHS', 0))
+NEWS_RETENTION_DROP = os.getenv('NEWS_RETENTION_DROP', 'false').lower() == 'true'
+
+def main():
+    start_time = time.time()
+    logging.info("Starting news table maintenance task")
+    table_name = News.__tablename__
+    cutoff = month_start(datetime.now(timezone.utc).date(), -NEWS_RETENTION_MONTHS)
+
+    # A failing retention step must not keep the cleanup below from running
+    try:
+        if is_partitioned(engine, table_name):
+            created = ensure_partitions(engine, table_name, NEWS_PARTITIONS_AHEAD)
+            logging.info(f"Ensured partitions {created[0]} .. {created[-1]}")
+            if NEWS_RETENTION_MONTHS:
+                detached = detach_old_partitions(engine, table_name, cutoff, drop=NEWS_RETENTION_DROP)
+                logging.info(f"Retention removed {len(detached)} partitions older than {cutoff}")
+        elif NEWS_RETENTION_MONTHS:
+            archive_old_rows(engine, News.__table__, NEWS_PARTITION_KEY, cutoff, drop=NEWS_RETENTION_DROP)
+    except Exception as e:
+        logging.error(f"Error applying news retention: {e}")
+    prune_enrich_state()
+    seed_company_names()
+
+    end_time = time.time()
+    logging.info(f"Maintenance task completed. Duration: {end_time - start_time:.2f} seconds")
+
+# One-off: python -m tasks.maintenance --convert rebuilds an existing plain table as partitioned
+def convert():
+    if not supports_partitioning(engine):
+        logging.info(f"{engine.dialect.name} does not support partitioning, keeping a plain news table")
+        return
+    create_tables()
+    if is_partitioned(engine, News.__tablename__):
+        logging.info("News table is already partitioned")
+        return
+    convert_to_partitioned(engine, News.__table__, NEWS_PARTITION_KEY, NEWS_PARTITIONS_AHEAD)
+
+# One-off: python -m tasks.maintenance --seed-companies listing.csv loads company names from a
+# CSV with ticker and name columns (further rows for the same ticker become aliases)
+def seed_companies(path):
+    listing = pd.read_csv(path, usecols=['ticker', 'name']).dropna()
+    seed_company_names(listing.groupby('ticker')['name'].apply(list).to_dict())
+
+if __name__ == "__main__":
+    if '--convert' in sys.argv:
+        convert()
+    elif '--seed-companies' in sys.argv:
+        seed_companies(sys.argv[sys.argv.index('--seed-companies') + 1])
+    else:
+        main()
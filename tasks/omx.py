@@ -2,12 +2,27 @@ import asyncio
 from playwright.async_api import async_playwright
 import pandas as pd
 import logging
-from utils.db_util import map_to_db, add_news_items
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from utils.db_util import map_to_db
+from utils.async_db_util import add_news_items_async
+from utils.metrics_util import timer, inc
+from utils.company_util import resolve_tickers
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 DEFAULT_URL = "https://www.nasdaqomxnordic.com/news/companynews"
 DEFAULT_BROWSER = "firefox"
+# The listing shows Stockholm local time without an offset
+LISTING_TIMEZONE = ZoneInfo('Europe/Stockholm')
+
+def parse_date(date_string):
+    logging.debug(f"Parsing date: {date_string}")
+    try:
+        return datetime.strptime(date_string.strip(), '%Y-%m-%d %H:%M:%S').replace(tzinfo=LISTING_TIMEZONE)
+    except ValueError as e:
+        logging.error(f"Error parsing date: {e}")
+        return None
 
 async def scrape_nasdaq_news():
     async with async_playwright() as p:
@@ -16,39 +31,42 @@ async def scrape_nasdaq_news():
         context = await browser.new_context(ignore_https_errors=True)
         page = await context.new_page()
 
-        logging.info(f"Navigating to {DEFAULT_URL}")
-        await page.goto(DEFAULT_URL)
+        with timer('fetch'):
+            logging.info(f"Navigating to {DEFAULT_URL}")
+            await page.goto(DEFAULT_URL)
 
-        logging.info("Waiting for the news table to load")
-        await page.wait_for_selector('#searchNewsTableId')
+            logging.info("Waiting for the news table to load")
+            await page.wait_for_selector('#searchNewsTableId')
 
         logging.info("Extracting news data")
         news_data = []
-        rows = await page.query_selector_all('#searchNewsTableId tbody tr')
-        
-        for row in rows:
-            columns = await row.query_selector_all('td')
-            if len(columns) >= 5:
-                date = await columns[0].inner_text()
-                company = await columns[1].inner_text()
-                category = await columns[2].inner_text()
-                headline_link = await columns[3].query_selector('a')
-                headline = await headline_link.inner_text() if headline_link else "N/A"
-                link = await headline_link.get_attribute('href') if headline_link else "N/A"
-                
-                news_data.append({
-                    'published_date': date,
-                    'company': company,
-                    'title': headline,
-                    'link': link,
-                    'publisher_topic': category,
-                    'publisher': 'omx',
-                    'status': 'raw'
-                })
+        with timer('parse'):
+            rows = await page.query_selector_all('#searchNewsTableId tbody tr')
+
+            for row in rows:
+                columns = await row.query_selector_all('td')
+                if len(columns) >= 5:
+                    date = await columns[0].inner_text()
+                    company = await columns[1].inner_text()
+                    category = await columns[2].inner_text()
+                    headline_link = await columns[3].query_selector('a')
+                    headline = await headline_link.inner_text() if headline_link else "N/A"
+                    link = await headline_link.get_attribute('href') if headline_link else "N/A"
+
+                    news_data.append({
+                        'published_date': parse_date(date),
+                        'company': company,
+                        'title': headline,
+                        'link': link,
+                        'publisher_topic': category,
+                        'publisher': 'omx',
+                        'status': 'raw'
+                    })
 
         await browser.close()
         
         df = pd.DataFrame(news_data)
+        inc('items_scraped', len(df))
         logging.info(f"Scraped {len(df)} news items")
         return df
 
@@ -58,10 +76,12 @@ async def main():
         logging.info(f"Got OMX dataframe with {len(df)} rows")
         logging.info(f"Sample data:\n{df.head()}")
         
-        news_items = map_to_db(df, 'omx')
+        # Ticker lookup and topic mapping may hit the database or the LLM, so keep them off the loop
+        df = await asyncio.to_thread(resolve_tickers, df)
+        news_items = await asyncio.to_thread(map_to_db, df, 'omx')
 
-        add_news_items(news_items)
-        logging.info(f"OMX: added {len(news_items)} news items to the database")
+        added = await add_news_items_async(news_items, skip_existing=True)
+        logging.info(f"OMX: added {added} news items to the database")
     except Exception as e:
         logging.error(f"OMX: An error occurred: {str(e)}")
 
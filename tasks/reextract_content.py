@@ -0,0 +1,62 @@
+import logging
+import time
+from utils.db_util import Session, News
+from utils.web_util import extract_text
+from utils.metrics_util import timer
+from utils import archive_util
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BATCH_SIZE = 500
+
+# Rebuild News.content from the local page archive without touching the network,
+# e.g. after changing extract_text or CONTENT_CHAR_LIMIT.
+def reextract_batch(session, rows):
+    archived = archive_util.has_urls(link for _, link in rows if link)
+    updates = []
+    for news_id, link in rows:
+        if link not in archived:
+            continue
+        text = extract_text(archive_util.get(link))
+        # Keep the existing content rather than blanking it when the archived page has no text
+        if text.strip():
+            updates.append({'id': news_id, 'content': text})
+    if updates:
+        with timer('db_write'):
+            session.bulk_update_mappings(News, updates)
+            session.commit()
+    return len(updates)
+
+def main():
+    start_time = time.time()
+    logging.info("Starting content re-extraction from page archive")
+    archive_util.stats()
+
+    session = Session()
+    try:
+        updated_count = 0
+        last_id = 0
+        while True:
+            with timer('db_read'):
+                rows = session.query(News.id, News.link) \
+                              .filter(News.id > last_id, News.link.isnot(None)) \
+                              .order_by(News.id) \
+                              .limit(BATCH_SIZE) \
+                              .all()
+            if not rows:
+                break
+            updated_count += reextract_batch(session, rows)
+            last_id = rows[-1].id
+            logging.info(f"Re-extracted content for {updated_count} news items so far")
+        logging.info(f"Re-extracted content for {updated_count} news items")
+    except Exception as e:
+        logging.error(f"Error re-extracting content: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+    end_time = time.time()
+    logging.info(f"Content re-extraction task completed. Duration: {end_time - start_time:.2f} seconds")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import logging
+import time
+from utils.db_util import Session, News, downloaded_within
+from utils.metrics_util import timer
+from utils import voice_util
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Only summaries of recently downloaded news are read out; older ones were rendered on earlier runs
+AUDIO_LOOKBACK_DAYS = int(os.getenv('AUDIO_LOOKBACK_DAYS', 2))
+BATCH_SIZE = 100
+
+def main():
+    start_time = time.time()
+    logging.info("Starting audio rendering task")
+    if not voice_util.API_KEY and 'ELEVENLABS_URL' not in os.environ:
+        logging.info("ELEVENLABS_API_KEY is not set, skipping audio rendering")
+        return
+
+    session = Session()
+    try:
+        rendered_count = 0
+        last_id = 0
+        while True:
+            with timer('db_read'):
+                rows = session.query(News.id, News.ai_summary) \
+                              .filter(News.id > last_id, News.ai_summary.isnot(None), News.ai_summary != '',
+                                      downloaded_within(AUDIO_LOOKBACK_DAYS)) \
+                              .order_by(News.id) \
+                              .limit(BATCH_SIZE) \
+                              .all()
+            if not rows:
+                break
+            paths = voice_util.render_audio([row.ai_summary for row in rows])
+            rendered_count += len(paths)
+            last_id = rows[-1].id
+        logging.info(f"Audio available for {rendered_count} news summaries")
+    except Exception as e:
+        logging.error(f"Error rendering audio: {e}")
+    finally:
+        session.close()
+
+    end_time = time.time()
+    logging.info(f"Audio rendering task completed. Duration: {end_time - start_time:.2f} seconds")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+# Local content-addressed archive of raw fetched pages. Bodies are stored once
+# per SHA-256 hash, compressed, and every fetched URL points at its body.
+ARCHIVE_PATH = os.getenv('PAGE_ARCHIVE_PATH', 'data/page_archive.sqlite3')
+ZSTD_LEVEL = 10
+
+_local = threading.local()
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    # Reconnect when ARCHIVE_PATH was repointed, e.g. per benchmark scenario
+    if conn is None or _local.path != ARCHIVE_PATH:
+        if conn is not None:
+            conn.close()
+        directory = os.path.dirname(ARCHIVE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(ARCHIVE_PATH, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            status_code INTEGER,
+            content_type TEXT,
+            fetched_at TEXT NOT NULL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_pages_hash ON pages(hash)')
+        conn.commit()
+        _local.conn = conn
+        _local.path = ARCHIVE_PATH
+    return conn
+
+def compress(data):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+def put(url, content, status_code=200, content_type=None):
+    content_hash = hashlib.sha256(content).hexdigest()
+    conn = _connection()
+    with conn:
+        if conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (content_hash,)).fetchone() is None:
+            codec, data = compress(content)
+            conn.execute('INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)',
+                         (content_hash, codec, len(content), data))
+        conn.execute('INSERT OR REPLACE INTO pages (url, hash, status_code, content_type, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                     (url, content_hash, status_code, content_type, datetime.utcnow().isoformat()))
+    return content_hash
+
+def get_by_hash(content_hash):
+    row = _connection().execute('SELECT codec, data FROM blobs WHERE hash = ?', (content_hash,)).fetchone()
+    return decompress(*row) if row else None
+
+def get(url):
+    row = _connection().execute(
+        'SELECT b.codec, b.data FROM pages p JOIN blobs b ON b.hash = p.hash WHERE p.url = ?', (url,)
+    ).fetchone()
+    return decompress(*row) if row else None
+
+def has_urls(urls):
+    conn = _connection()
+    found = set()
+    urls = list(urls)
+    # Stay well below SQLite's bound-parameter limit
+    for i in range(0, len(urls), 500):
+        chunk = urls[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        found.update(row[0] for row in conn.execute(f'SELECT url FROM pages WHERE url IN ({placeholders})', chunk))
+    return found
+
+def stats():
+    conn = _connection()
+    pages = conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+    blobs, raw_bytes, stored_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs').fetchone()
+    logging.info(f"Page archive: {pages} urls, {blobs} blobs, {raw_bytes} bytes raw, {stored_bytes} bytes stored")
+    return {'pages': pages, 'blobs': blobs, 'raw_bytes': raw_bytes, 'stored_bytes': stored_bytes}
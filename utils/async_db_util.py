@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+from urllib.parse import parse_qsl, urlencode
+from datetime import datetime, timezone
+from sqlalchemy import insert, update, select
+from sqlalchemy.pool import NullPool
+from utils.db_util import DATABASE_URL, News, add_news_items, downloaded_within, DEDUPE_LOOKBACK_DAYS
+from utils.metrics_util import timer, inc
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+except ImportError:
+    create_async_engine = None
+
+# Async counterparts of the db_util write path for the asyncio scrapers. The engine
+# uses asyncpg on Postgres and aiosqlite locally; when neither driver is installed,
+# or an async connection cannot be opened, the sync functions run in a worker thread instead. Every task run gets its own
+# event loop (asyncio.run), and async connections belong to the loop that opened
+# them, so the engine does not pool connections.
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+BATCH_SIZE = 500
+# libpq's sslmode is not understood by asyncpg, which takes the same values as ssl
+SSL_QUERY_PARAMS = {'sslmode': 'ssl'}
+
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+# Set when an async connection could not be opened; later writes go straight to the sync path
+_async_unavailable = False
+
+def async_url(url):
+    scheme, sep, rest = url.partition('://')
+    driver = ASYNC_DRIVERS.get(scheme.split('+')[0])
+    if not driver:
+        return url
+    if driver.endswith('asyncpg') and '?' in rest:
+        rest, query = rest.split('?', 1)
+        params = [(SSL_QUERY_PARAMS.get(key, key), value) for key, value in parse_qsl(query, keep_blank_values=True)]
+        rest = f'{rest}?{urlencode(params)}'
+    return f'{driver}{sep}{rest}'
+
+def get_async_session():
+    global _engine, _session_factory
+    if create_async_engine is None or _async_unavailable:
+        return None
+    # Scrapers run on separate scheduler threads, so only one may create the engine
+    with _engine_lock:
+        if _session_factory is None:
+            try:
+                _engine = create_async_engine(async_url(DATABASE_URL), poolclass=NullPool)
+            except ImportError as e:
+                logging.warning(f"Async database driver unavailable, using the sync path: {e}")
+                return None
+            _session_factory = async_sessionmaker(_engine, expire_on_commit=False)
+    return _session_factory()
+
+def news_records(news_items):
+    columns = [c.key for c in News.__table__.columns if c.key != 'id']
+    return [{c: getattr(item, c) for c in columns} for item in news_items]
+
+def batches(rows, size=BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+# Bulk insert News objects. With skip_existing, links already stored in the dedupe
+# window are left out, so a re-scrape of the same listing writes nothing.
+async def add_news_items_async(news_items, skip_existing=False):
+    global _async_unavailable
+    session = get_async_session()
+    if session is None:
+        return await add_news_items_sync(news_items)
+    try:
+        # Opening the connection is where a missing driver or an unreachable server shows up
+        await session.connection()
+    except Exception as e:
+        logging.warning(f"Async database connection failed, using the sync path: {e}")
+        _async_unavailable = True
+        await session.close()
+        return await add_news_items_sync(news_items)
+    for item in news_items:
+        item.downloaded_at = datetime.now(timezone.utc)
+    records = news_records(news_items)
+    try:
+        async with session:
+            with timer('db_write'):
+                if skip_existing and records:
+                    links = {r['link'] for r in records}
+                    result = await session.execute(
+                        select(News.link).where(News.link.in_(links), downloaded_within(DEDUPE_LOOKBACK_DAYS)))
+                    existing = set(result.scalars())
+                    records = [r for r in records if r['link'] not in existing]
+                for batch in batches(records):
+                    await session.execute(insert(News), batch)
+                await session.commit()
+    except Exception as e:
+        logging.error(f"An error occurred while adding news items: {e}")
+        inc('rows_failed', len(records))
+        raise
+    inc('rows_written', len(records))
+    logging.info(f"Successfully added {len(records)} news items to the database ({len(news_items) - len(records)} already stored)")
+    return len(records)
+
+async def add_news_items_sync(news_items):
+    added = await asyncio.to_thread(add_news_items, news_items)
+    if news_items and not added:
+        raise RuntimeError(f"Failed to add {len(news_items)} news items")
+    return added
+
+# Batched updates by primary key; each dict holds 'id' and the columns to set
+async def update_news_async(updates):
+    session = get_async_session()
+    if session is None:
+        raise RuntimeError("No async database driver available")
+    async with session:
+        with timer('db_write'):
+            for batch in batches(updates):
+                await session.execute(update(News), batch)
+            await session.commit()
+    inc('rows_written', len(updates))
+    return len(updates)
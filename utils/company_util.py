@@ -0,0 +1,138 @@
+import os
+import re
+import time
+import logging
+import unicodedata
+import pandas as pd
+from utils.db_util import get_companies, save_company_name
+from utils.openai_util import extract_ticker
+from utils.metrics_util import inc
+
+# Company name -> ticker resolution from the company table, so extract_ticker
+# (an LLM call) is only needed for names the table does not know.
+COMPANY_INDEX_TTL = 6 * 3600
+NGRAM_SIZE = 3
+FUZZY_THRESHOLD = 0.8
+# Asking the LLM for names the table does not know costs a call per company, so it is opt-in.
+# Its answers are saved to the company table; failed calls are not retried for COMPANY_INDEX_TTL.
+TICKER_LLM_FALLBACK = os.getenv('TICKER_LLM_FALLBACK', 'false').lower() == 'true'
+
+# Legal-form and filler tokens that differ between listings of the same company
+LEGAL_SUFFIXES = {
+    'ab', 'abp', 'publ', 'asa', 'as', 'a', 's', 'oyj', 'oy', 'plc', 'sa', 'se', 'nv', 'ag', 'hf', 'ltd', 'limited',
+    'inc', 'corp', 'corporation', 'co', 'group', 'holding', 'holdings', 'grupp', 'grupe', 'uab', 'the',
+}
+
+_non_alnum = re.compile(r'[^0-9a-z]+')
+_company_index = None
+_company_index_built_at = 0
+# Resolved name -> ticker (or None), including LLM answers, kept for the process lifetime
+_ticker_cache = {}
+# Company -> time of the last failed LLM call
+_ticker_failures = {}
+
+def normalize_name(name):
+    if name is None or (isinstance(name, float) and pd.isna(name)):
+        return ''
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    tokens = _non_alnum.sub(' ', name.lower()).split()
+    stripped = [t for t in tokens if t not in LEGAL_SUFFIXES]
+    # Never strip a name down to nothing, e.g. "AS Group"
+    return ' '.join(stripped or tokens)
+
+def ngrams(text):
+    padded = f' {text} '
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+# Build exact and n-gram lookups from (name, aliases, yf_ticker, mw_ticker) rows
+def build_company_index(companies):
+    exact = {}
+    grams = {}
+    postings = {}
+    for name, aliases, yf_ticker, mw_ticker in companies:
+        ticker = yf_ticker or mw_ticker
+        if not ticker:
+            continue
+        names = [name] + (aliases.split('|') if aliases else [])
+        for alias in names:
+            key = normalize_name(alias)
+            if not key or key in exact:
+                continue
+            exact[key] = ticker
+            grams[key] = ngrams(key)
+            for gram in grams[key]:
+                postings.setdefault(gram, []).append(key)
+    logging.info(f"Built company index with {len(exact)} names")
+    return {'exact': exact, 'grams': grams, 'postings': postings}
+
+def get_company_index(refresh=False):
+    global _company_index, _company_index_built_at
+    if refresh or _company_index is None or time.time() - _company_index_built_at > COMPANY_INDEX_TTL:
+        try:
+            _company_index = build_company_index(get_companies())
+        except Exception as e:
+            logging.warning(f"Could not load company index: {e}")
+            _company_index = build_company_index([])
+        _company_index_built_at = time.time()
+    return _company_index
+
+def resolve_name(index, name):
+    key = normalize_name(name)
+    if not key:
+        return None
+    if key in index['exact']:
+        return index['exact'][key]
+
+    # Dice similarity over shared n-grams, only scoring names that share at least one
+    query = ngrams(key)
+    shared = {}
+    for gram in query:
+        for candidate in index['postings'].get(gram, ()):
+            shared[candidate] = shared.get(candidate, 0) + 1
+    best_key, best_score = None, 0
+    for candidate, count in shared.items():
+        score = 2 * count / (len(query) + len(index['grams'][candidate]))
+        if score > best_score:
+            best_key, best_score = candidate, score
+    return index['exact'][best_key] if best_score >= FUZZY_THRESHOLD else None
+
+# Add a ticker column to a scraped DataFrame, resolving each distinct company once
+def resolve_tickers(df, llm_fallback=None):
+    if llm_fallback is None:
+        llm_fallback = TICKER_LLM_FALLBACK
+    if df.empty or 'company' not in df.columns:
+        return df
+    index = get_company_index()
+    companies = [c for c in df['company'].dropna().unique() if c and c != 'N/A']
+
+    misses = []
+    for company in companies:
+        if company in _ticker_cache:
+            continue
+        ticker = resolve_name(index, company)
+        if ticker:
+            _ticker_cache[company] = ticker
+        else:
+            misses.append(company)
+    inc('ticker_index_hits', len(companies) - len(misses))
+
+    # Without any names in the table every company would be a miss
+    if llm_fallback and misses and index['exact']:
+        titles = df.drop_duplicates('company').set_index('company')['title']
+        for company in misses:
+            if time.time() - _ticker_failures.get(company, 0) < COMPANY_INDEX_TTL:
+                continue
+            try:
+                ticker = extract_ticker(f"{company}: {titles.get(company, '')}")
+                inc('ticker_llm_calls')
+            except Exception as e:
+                logging.error(f"Error extracting ticker for {company}: {e}")
+                _ticker_failures[company] = time.time()
+                continue
+            _ticker_cache[company] = ticker
+            if ticker:
+                save_company_name(company, ticker)
+
+    df['ticker'] = df['company'].map(lambda c: _ticker_cache.get(c))
+    logging.info(f"Resolved tickers for {df['ticker'].notna().sum()}/{len(df)} rows ({len(misses)} index misses)")
+    return df
@@ -1,11 +1,18 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, func, and_
+import json
+import base64
+from sqlalchemy import create_engine, inspect, text, true, exists, Column, Integer, String, DateTime, Text, Index, func, and_, or_, tuple_
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, aliased
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 import logging
-from datetime import datetime
+import time
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from utils.topic_util import build_topic_index, resolve_topics
+from utils.metrics_util import timer, inc
+from utils.schema_util import supports_partitioning, is_partitioned, create_partitioned_table, ensure_partitions
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +23,34 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 # Create SQLAlchemy engine and session
 engine = create_engine(DATABASE_URL)
 Session = sessionmaker(bind=engine)
+
+# Publisher topic -> AI topic index is rebuilt from history every few hours
+TOPIC_INDEX_TTL = 6 * 3600
+_topic_index = None
+_topic_index_built_at = 0
+
+# On Postgres a new news table is range-partitioned by month on downloaded_at
+NEWS_PARTITIONING = os.getenv('NEWS_PARTITIONING', 'true').lower() == 'true'
+NEWS_PARTITION_KEY = 'downloaded_at'
+NEWS_PARTITIONS_AHEAD = 3
+
+# Work queries only look at recently downloaded rows so they touch recent partitions (0 = all history)
+ENRICH_LOOKBACK_DAYS = int(os.getenv('ENRICH_LOOKBACK_DAYS', 30))
+DEDUPE_LOOKBACK_DAYS = int(os.getenv('DEDUPE_LOOKBACK_DAYS', 7))
+# Rows whose page is dead or empty, or whose prompt the LLM rejects, are retried with exponential backoff, then given up on.
+# Rows whose page is dead or empty are retried with exponential backoff, then given up on.
+# Transient failures (LLM outages, timeouts, 5xx) never use an attempt but back off up to ENRICH_TRANSIENT_BACKOFF_MAX.
+ENRICH_MAX_ATTEMPTS = 5
+ENRICH_BACKOFF_BASE = timedelta(minutes=30)
+ENRICH_BACKOFF_MAX = timedelta(days=2)
+ENRICH_TRANSIENT_BACKOFF_MAX = timedelta(hours=6)
+ENRICH_FAILED = 'failed'
+ENRICH_RETRYING = 'retrying'
+# Enrichment stages tracked separately, one per enrich task
+ENRICH_CONTENT = 'content'
+ENRICH_SUMMARY = 'summary'
+ENRICH_TAG = 'tag'
+
 # Define the News model
 Base = declarative_base()
 
@@ -35,39 +70,296 @@ class News(Base):
     publisher = Column(String(255))
     downloaded_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
     status = Column(String(255))
+    ticker = Column(String(255))
+
+    # Keyset pagination on (published_date, id), optionally narrowed by one filter column
+    __table_args__ = (
+        Index('ix_news_published_date_id', 'published_date', 'id'),
+        Index('ix_news_publisher_published_date_id', 'publisher', 'published_date', 'id'),
+        Index('ix_news_company_published_date_id', 'company', 'published_date', 'id'),
+        Index('ix_news_ai_topic_published_date_id', 'ai_topic', 'published_date', 'id'),
+        # Duplicate lookup by link, and the pending-work queues of the enrichment tasks
+        Index('ix_news_link_downloaded_at', 'link', 'downloaded_at'),
+        Index('ix_news_pending_content', 'downloaded_at',
+              postgresql_where=text('content IS NULL'), sqlite_where=text('content IS NULL')),
+        Index('ix_news_pending_summary', 'downloaded_at',
+              postgresql_where=text('ai_summary IS NULL'), sqlite_where=text('ai_summary IS NULL')),
+        Index('ix_news_pending_topic', 'downloaded_at',
+              postgresql_where=text('ai_topic IS NULL'), sqlite_where=text('ai_topic IS NULL')),
+        Index('ix_news_pending_clean', 'downloaded_at',
+              postgresql_where=text("status = 'raw'"), sqlite_where=text("status = 'raw'")),
+    )
+
+# Retry state of a news row in one enrichment stage; rows without an entry have not failed
+class EnrichState(Base):
+    __tablename__ = 'news_enrich_state'
+
+    news_id = Column(Integer, primary_key=True)
+    stage = Column(String(32), primary_key=True)
+    state = Column(String(32))
+    attempts = Column(Integer, default=0)
+    transient_failures = Column(Integer, default=0)
+    error = Column(Text)
+    next_at = Column(TIMESTAMP(timezone=True))
+
+class Company(Base):
+    __tablename__ = 'company'
+
+    id = Column(Integer, primary_key=True)
+    yf_ticker = Column(String(255))
+    mw_ticker = Column(String(255))
+    yf_url = Column(String(255))
+    mw_url = Column(String(255))
+    name = Column(String(255))
+    aliases = Column(Text)  # alternative names, separated by '|'
+
+# Columns served by the news API; content is only loaded when asked for
+NEWS_API_COLUMNS = ['id', 'title', 'link', 'company', 'published_date', 'content', 'ai_summary', 'ai_topic',
+                    'industry', 'publisher_topic', 'publisher', 'downloaded_at', 'status', 'ticker']
+DEFAULT_NEWS_API_COLUMNS = [c for c in NEWS_API_COLUMNS if c != 'content']
+
+# create_all never alters existing tables, so add columns introduced since they were created
+def add_missing_columns():
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logging.info(f"Added column {table.name}.{column.name}")
 
 def create_tables():
+    if NEWS_PARTITIONING and supports_partitioning(engine) and not inspect(engine).has_table(News.__tablename__):
+        create_partitioned_table(engine, News.__table__, NEWS_PARTITION_KEY, NEWS_PARTITIONS_AHEAD)
     Base.metadata.create_all(engine)
+    add_missing_columns()
+    # create_all skips indexes on tables that already exist
+    for index in News.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    if is_partitioned(engine, News.__tablename__):
+        ensure_partitions(engine, News.__tablename__, NEWS_PARTITIONS_AHEAD)
+
+# Restrict a news query to rows downloaded in the last `days` days
+def downloaded_within(days, now=None):
+    if not days:
+        return true()
+    now = now or datetime.now(timezone.utc)
+    return News.downloaded_at >= now - timedelta(days=days)
 
 def add_news_items(news_items):
     session = Session()
     try:
         for item in news_items:
             item.downloaded_at = datetime.utcnow()
-        session.add_all(news_items)
-        session.commit()
+        with timer('db_write'):
+            session.add_all(news_items)
+            session.commit()
+        inc('rows_written', len(news_items))
         print(f"Successfully added {len(news_items)} news items to the database.")
+        return len(news_items)
     except Exception as e:
         print(f"An error occurred: {e}")
+        inc('rows_failed', len(news_items))
+        session.rollback()
+        return 0
+    finally:
+        session.close()
+
+# Work-selection filter: skip rows that gave up on this stage or are still backing off
+def enrich_eligible(stage, now=None):
+    now = now or datetime.now(timezone.utc)
+    return ~exists().where(EnrichState.news_id == News.id, EnrichState.stage == stage,
+                           or_(EnrichState.state == ENRICH_FAILED, EnrichState.next_at > now))
+
+# Only permanent failures (dead or empty pages) count toward giving up on a row
+def record_enrich_failure(session, news_id, stage, error, permanent=True, now=None):
+    now = now or datetime.now(timezone.utc)
+    entry = session.get(EnrichState, (news_id, stage))
+    if entry is None:
+        entry = EnrichState(news_id=news_id, stage=stage, attempts=0, transient_failures=0)
+        session.add(entry)
+    entry.error = str(error)[:1000]
+    if not permanent:
+        entry.transient_failures = (entry.transient_failures or 0) + 1
+        entry.state = ENRICH_RETRYING
+        entry.next_at = now + min(ENRICH_BACKOFF_BASE * 2 ** (entry.transient_failures - 1), ENRICH_TRANSIENT_BACKOFF_MAX)
+        inc('enrich_transient')
+        return
+    entry.attempts = (entry.attempts or 0) + 1
+    if entry.attempts >= ENRICH_MAX_ATTEMPTS:
+        entry.state = ENRICH_FAILED
+        entry.next_at = None
+        inc('enrich_failed')
+    else:
+        entry.state = ENRICH_RETRYING
+        entry.next_at = now + min(ENRICH_BACKOFF_BASE * 2 ** (entry.attempts - 1), ENRICH_BACKOFF_MAX)
+        inc('enrich_retrying')
+
+def record_enrich_success(session, news_id, stage):
+    entry = session.get(EnrichState, (news_id, stage))
+    if entry is not None:
+        session.delete(entry)
+
+# Drop retry state of news rows that were deduplicated or aged out
+def prune_enrich_state():
+    session = Session()
+    try:
+        with timer('db_write'):
+            deleted = session.query(EnrichState) \
+                             .filter(~exists().where(News.id == EnrichState.news_id)) \
+                             .delete(synchronize_session=False)
+            session.commit()
+        logging.info(f"Pruned {deleted} orphaned enrichment states")
+        return deleted
+    finally:
+        session.close()
+
+def get_companies():
+    session = Session()
+    try:
+        with timer('db_read'):
+            return session.query(Company.name, Company.aliases, Company.yf_ticker, Company.mw_ticker).all()
+    finally:
+        session.close()
+
+def add_alias(company, name):
+    if not company.name:
+        company.name = name
+        return True
+    aliases = company.aliases.split('|') if company.aliases else []
+    if name.lower() in {a.lower() for a in [company.name] + aliases}:
+        return False
+    company.aliases = '|'.join(aliases + [name])
+    return True
+
+# Remember a name -> ticker answer (e.g. from the LLM) in the company table so it is resolved locally next time
+def save_company_name(name, ticker):
+    session = Session()
+    try:
+        with timer('db_write'):
+            company = session.query(Company) \
+                             .filter(or_(func.upper(Company.yf_ticker) == ticker.upper(),
+                                         func.upper(Company.mw_ticker) == ticker.upper())) \
+                             .first()
+            if company is None:
+                session.add(Company(mw_ticker=ticker, name=name))
+            elif not add_alias(company, name):
+                return
+            session.commit()
+    except Exception as e:
+        logging.error(f"Error saving company name {name} ({ticker}): {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+# Backfill company names and aliases, from a {ticker: [names]} mapping (e.g. a listing file)
+# and from the company names news rows were stored with for a known ticker
+def seed_company_names(listed=None):
+    session = Session()
+    try:
+        names = {ticker.upper(): list(aliases) for ticker, aliases in (listed or {}).items()}
+        with timer('db_read'):
+            pairs = session.query(News.ticker, News.company, func.count()) \
+                           .filter(News.ticker.isnot(None), News.company.isnot(None), News.company != 'N/A') \
+                           .group_by(News.ticker, News.company) \
+                           .order_by(func.count().desc()) \
+                           .all()
+        for ticker, company, _ in pairs:
+            names.setdefault(ticker.upper(), []).append(company)
+        updated = 0
+        with timer('db_write'):
+            for company in session.query(Company).all():
+                for ticker in {t.upper() for t in (company.yf_ticker, company.mw_ticker) if t}:
+                    # Listed names and then the most frequent spelling first, so they become the name
+                    for name in names.get(ticker, []):
+                        updated += add_alias(company, name)
+            session.commit()
+        logging.info(f"Seeded {updated} company names and aliases")
+        return updated
+    except Exception as e:
+        logging.error(f"Error seeding company names: {e}")
         session.rollback()
+        return 0
+    finally:
+        session.close()
+
+def get_recent_contents(publisher, limit):
+    session = Session()
+    try:
+        with timer('db_read'):
+            rows = session.query(News.content) \
+                          .filter(News.publisher == publisher, News.content.isnot(None)) \
+                          .order_by(News.id.desc()) \
+                          .limit(limit) \
+                          .all()
+        return [row.content for row in rows]
+    finally:
+        session.close()
+
+def count_recent_news(publisher, since):
+    session = Session()
+    try:
+        with timer('db_read'):
+            return session.query(func.count(func.distinct(News.link))) \
+                          .filter(News.publisher == publisher, News.published_date >= since) \
+                          .scalar() or 0
+    finally:
+        session.close()
+
+def get_topic_cooccurrence():
+    session = Session()
+    try:
+        with timer('db_read'):
+            rows = session.query(News.publisher, News.publisher_topic, News.industry, News.ai_topic, func.count(News.id)) \
+                          .filter(News.publisher_topic.isnot(None), News.publisher_topic != '', News.ai_topic.isnot(None)) \
+                          .group_by(News.publisher, News.publisher_topic, News.industry, News.ai_topic) \
+                          .all()
+        return rows
     finally:
         session.close()
 
+def get_topic_index(refresh=False):
+    global _topic_index, _topic_index_built_at
+    if refresh or _topic_index is None or time.time() - _topic_index_built_at > TOPIC_INDEX_TTL:
+        try:
+            _topic_index = build_topic_index(get_topic_cooccurrence())
+        except Exception as e:
+            logging.warning(f"Could not learn topic index from history, using static rules only: {e}")
+            _topic_index = build_topic_index()
+        _topic_index_built_at = time.time()
+    return _topic_index
+
+# pandas Timestamp/NaT -> datetime/None, which every driver (asyncpg included) can bind
+def to_datetime(value):
+    if value is None or pd.isna(value):
+        return None
+    return value.to_pydatetime() if isinstance(value, pd.Timestamp) else value
+
 def map_to_db(df, source):
     logging.info(f"Mapping dataframe to News objects for source: {source}")
     news_items = []
-    for _, row in df.iterrows():
+    # Rows whose publisher topic maps deterministically get ai_topic now and skip LLM tagging
+    topics = resolve_topics(df, get_topic_index())
+    for index, row in df.iterrows():
         news_item = News(
             title=row['title'],
             link=row['link'],
             company=row['company'],
-            published_date=row['published_date'],
+            published_date=to_datetime(row['published_date']),
             publisher_topic=row['publisher_topic'],
             publisher=row['publisher'],
             downloaded_at=datetime.utcnow(),
             status=row['status']
         )
 
+        # Map ticker when it was resolved before mapping
+        if 'ticker' in row and pd.notna(row['ticker']):
+            news_item.ticker = row['ticker']
+
         # Map industry only if source is 'euronext'
         if source == 'euronext':
             news_item.industry = row['industry']
@@ -76,6 +368,8 @@ def map_to_db(df, source):
         if row['publisher'] == 'ai':
             news_item.ai_summary = row['ai_summary']
             news_item.ai_topic = row['ai_topic']
+        elif topics[index] is not None:
+            news_item.ai_topic = topics[index]
 
         news_items.append(news_item)
     
@@ -85,24 +379,28 @@ def map_to_db(df, source):
 def remove_duplicate_news():
     session = Session()
     try:
-        # Step 1: Remove duplicates
-        # Subquery to find the oldest record for each link
-        subquery = session.query(News.link, func.min(News.downloaded_at).label('min_downloaded_at')) \
-                          .group_by(News.link) \
-                          .subquery()
-        
-        # Query to select duplicate records that are not the oldest
-        duplicates = session.query(News.id) \
-                            .join(subquery, and_(News.link == subquery.c.link,
-                                                 News.downloaded_at != subquery.c.min_downloaded_at))
-        
-        # Delete the duplicates
-        deleted_count = session.query(News).filter(News.id.in_(duplicates)).delete(synchronize_session='fetch')
-        
-        # Step 2: Update status of remaining items
-        updated_count = session.query(News).filter(News.status == 'raw').update({News.status: 'clean'}, synchronize_session='fetch')
+        with timer('db_write'):
+            # Step 1: Remove duplicates
+            # Only recently downloaded rows can be new duplicates; each is checked against
+            # any older row with the same link through the (link, downloaded_at) index.
+            # The window reaches back to the oldest raw row, so a clean task that has not
+            # run for a while still covers everything downloaded since.
+            recent = downloaded_within(DEDUPE_LOOKBACK_DAYS)
+            oldest_raw = session.query(func.min(News.downloaded_at)).filter(News.status == 'raw').scalar()
+            if oldest_raw is not None:
+                recent = or_(recent, News.downloaded_at >= oldest_raw)
+            older = aliased(News)
+            duplicates = session.query(News.id) \
+                                .filter(recent, exists().where(and_(older.link == News.link,
+                                                                    older.downloaded_at < News.downloaded_at)))
+
+            # Delete the duplicates
+            deleted_count = session.query(News).filter(recent, News.id.in_(duplicates)).delete(synchronize_session='fetch')
+
+            # Step 2: Update status of remaining items
+            updated_count = session.query(News).filter(recent, News.status == 'raw').update({News.status: 'clean'}, synchronize_session='fetch')
         
-        session.commit()
+            session.commit()
         logging.info(f"Successfully removed {deleted_count} duplicate news items.")
         logging.info(f"Updated status to 'clean' for {updated_count} news items.")
         return deleted_count, updated_count
@@ -111,4 +409,48 @@ def remove_duplicate_news():
         session.rollback()
         return 0, 0
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+def encode_cursor(published_date, news_id):
+    raw = json.dumps([published_date.isoformat(), news_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    published_date, news_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return datetime.fromisoformat(published_date), int(news_id)
+
+def query_news(publisher=None, company=None, ai_topic=None, date_from=None, date_to=None,
+               columns=None, cursor=None, limit=50):
+    columns = columns or DEFAULT_NEWS_API_COLUMNS
+    # id and published_date are always selected because the cursor is built from them
+    selected = list(dict.fromkeys(['id', 'published_date'] + list(columns)))
+    session = Session()
+    try:
+        query = session.query(*[getattr(News, c) for c in selected]).filter(News.published_date.isnot(None))
+        if publisher:
+            query = query.filter(News.publisher == publisher)
+        if company:
+            query = query.filter(News.company == company)
+        if ai_topic:
+            query = query.filter(News.ai_topic == ai_topic)
+        if date_from:
+            query = query.filter(News.published_date >= date_from)
+        if date_to:
+            query = query.filter(News.published_date < date_to)
+        if cursor:
+            query = query.filter(tuple_(News.published_date, News.id) < tuple_(*decode_cursor(cursor)))
+
+        with timer('db_read'):
+            rows = query.order_by(News.published_date.desc(), News.id.desc()).limit(limit + 1).all()
+
+        items = []
+        for row in rows[:limit]:
+            item = {}
+            for column in columns:
+                value = getattr(row, column)
+                item[column] = value.isoformat() if isinstance(value, datetime) else value
+            items.append(item)
+        next_cursor = encode_cursor(rows[limit - 1].published_date, rows[limit - 1].id) if len(rows) > limit else None
+        return items, next_cursor
+    finally:
+        session.close()
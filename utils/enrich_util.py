@@ -1,43 +1,79 @@
 import logging
 import pandas as pd
-from utils.web_util import fetch_url_content
+import openai
+from utils.web_util import fetch_url_content, FetchError, TRANSIENT_STATUS_CODES
 from utils.openai_util import summarize, tag_news
 from utils.tag_util import tags
+from utils.metrics_util import timer
+
+# Credential problems fail every row alike, so they are not held against any one of them
+CONFIG_STATUS_CODES = {401, 403}
+
+# Dead or empty pages and prompts the LLM rejects (e.g. 400 Bad Request) count toward giving up on a row;
+# timeouts, rate limits and server errors are retried
+def is_permanent(error):
+    if isinstance(error, FetchError):
+        return error.permanent
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        return 400 <= status < 500 and status not in TRANSIENT_STATUS_CODES | CONFIG_STATUS_CODES
+    return False
+
+# Wrap a per-row function so each row's latency lands in the 'item' histogram
+def timed_item(func):
+    def wrapper(row):
+        with timer('item'):
+            return func(row)
+    return wrapper
 
 def enrich_tag_from_url(df):
     print("Starting enrichment process from URLs")
     logging.info("Starting enrichment process from URLs")
     
+    errors = {}
+    permanent = {}
+
     def fetch_and_tag(row):
         try:
             content = fetch_url_content(row['link'])
-            ai_topic = tag_news(content, tags)
+            ai_topic = tag_news(content, tags, row.get('publisher'))
             print(f"Generated tag for: {row['link']} - Tag: {ai_topic}")
             logging.info(f"Generated tag for: {row['link']} - Tag: {ai_topic}")
             return ai_topic
         except Exception as e:
             print(f"Error processing {row['link']}: {str(e)}")
             logging.error(f"Error processing {row['link']}: {str(e)}")
+            errors[row.name] = str(e)
+            permanent[row.name] = is_permanent(e)
             return None
     
-    df['ai_topic'] = df.apply(fetch_and_tag, axis=1)
+    df['ai_topic'] = df.apply(timed_item(fetch_and_tag), axis=1)
+    df['enrich_error'] = pd.Series(errors, index=df.index, dtype=object)
+    df['enrich_permanent'] = pd.Series(permanent, index=df.index, dtype=object).fillna(False).astype(bool)
     print(f"Enrichment completed for {len(df)} items")
     logging.info(f"Enrichment completed for {len(df)} items")
     return df
 
 def enrich_from_url(df):
     logging.info("Starting enrichment process from URLs")
+    errors = {}
+    permanent = {}
+
     def fetch_and_summarize(row):
         try:
             content = fetch_url_content(row['link'])
-            ai_summary = summarize(content)
+            ai_summary = summarize(content, row.get('publisher'))
             logging.info(f"Generated summary for: {row['link']} (first 50 chars): {ai_summary[:50]}...")
             return ai_summary
         except Exception as e:
             logging.error(f"Error processing {row['link']}: {str(e)}")
+            errors[row.name] = str(e)
+            permanent[row.name] = is_permanent(e)
             return None
     
-    df['ai_summary'] = df.apply(fetch_and_summarize, axis=1)
+    df['ai_summary'] = df.apply(timed_item(fetch_and_summarize), axis=1)
+    df['enrich_error'] = pd.Series(errors, index=df.index, dtype=object)
+    df['enrich_permanent'] = pd.Series(permanent, index=df.index, dtype=object).fillna(False).astype(bool)
     logging.info(f"Enrichment completed for {len(df)} items")
     return df
 
@@ -47,7 +83,7 @@ def enrich_from_content(df):
     def apply_tag(row):
         try:
             if pd.notna(row['content']) and row['content']:
-                ai_topic = tag_news(row['content'], tags)
+                ai_topic = tag_news(row['content'], tags, row.get('publisher'))
                 logging.info(f"AI topic for {row['link']}: {ai_topic}")
                 return ai_topic
             else:
@@ -60,7 +96,7 @@ def enrich_from_content(df):
     def apply_summary(row):
         try:
             if pd.notna(row['content']) and row['content']:
-                ai_summary = summarize(row['content'])
+                ai_summary = summarize(row['content'], row.get('publisher'))
                 logging.info(f"Generated AI summary for {row['link']} (first 50 chars): {ai_summary[:50]}...")
                 return ai_summary
             else:
@@ -70,8 +106,8 @@ def enrich_from_content(df):
             logging.error(f"Error summarizing news for {row['link']}: {str(e)}")
             return f"Error in summarization: {str(e)}"
 
-    df['ai_topic'] = df.apply(apply_tag, axis=1)
-    df['ai_summary'] = df.apply(apply_summary, axis=1)
+    df['ai_topic'] = df.apply(timed_item(apply_tag), axis=1)
+    df['ai_summary'] = df.apply(timed_item(apply_summary), axis=1)
     
     logging.info(f"Enrichment from content completed for {len(df)} items")
     return df
@@ -89,15 +125,20 @@ def enrich_content_from_url(df):
     def fetch_and_enrich(row):
         try:
             content = fetch_url_content(row['link'])
-            ai_summary = summarize(content)
-            ai_topic = tag_news(content, tags)
+            ai_summary = summarize(content, row.get('publisher'))
+            # Keep a topic already resolved from the publisher topic at ingest
+            ai_topic = row.get('ai_topic')
+            if pd.isna(ai_topic) or not ai_topic:
+                ai_topic = tag_news(content, tags, row.get('publisher'))
             logging.info(f"Enriched content for: {row['link']}")
-            return pd.Series({'content': content, 'ai_summary': ai_summary, 'ai_topic': ai_topic})
+            return pd.Series({'content': content, 'ai_summary': ai_summary, 'ai_topic': ai_topic, 'enrich_error': None,
+                              'enrich_permanent': False})
         except Exception as e:
             logging.error(f"Error processing {row['link']}: {str(e)}")
-            return pd.Series({'content': None, 'ai_summary': None, 'ai_topic': None})
+            return pd.Series({'content': None, 'ai_summary': None, 'ai_topic': None, 'enrich_error': str(e),
+                              'enrich_permanent': is_permanent(e)})
     
-    enriched = df.apply(fetch_and_enrich, axis=1)
-    df = pd.concat([df, enriched], axis=1)
+    enriched = df.apply(timed_item(fetch_and_enrich), axis=1)
+    df = pd.concat([df.drop(columns=['ai_topic'], errors='ignore'), enriched], axis=1)
     logging.info(f"Content enrichment completed for {len(df)} items")
     return df
\ No newline at end of file
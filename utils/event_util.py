@@ -0,0 +1,48 @@
+import threading
+from collections import deque
+
+# Recent dashboard events (task state changes, log lines) with increasing ids,
+# so a reconnecting client can resume from the last id it saw.
+EVENT_BUFFER_SIZE = 1000
+
+_condition = threading.Condition()
+_events = deque(maxlen=EVENT_BUFFER_SIZE)
+_last_id = 0
+
+def publish(event_type, data):
+    global _last_id
+    with _condition:
+        _last_id += 1
+        _events.append({'id': _last_id, 'type': event_type, 'data': data})
+        _condition.notify_all()
+
+def latest_id():
+    with _condition:
+        return _last_id
+
+# True when events after last_id have already been evicted from the buffer
+def is_stale(last_id):
+    with _condition:
+        return bool(_events) and last_id < _events[0]['id'] - 1
+
+def events_since(last_id):
+    with _condition:
+        return [event for event in _events if event['id'] > last_id]
+
+def wait_for_events(last_id, timeout):
+    with _condition:
+        _condition.wait_for(lambda: _last_id > last_id, timeout=timeout)
+    return events_since(last_id)
+
+# Each open stream holds a server thread, so only a few may be open at once
+_stream_slots = None
+
+def acquire_stream(max_streams):
+    global _stream_slots
+    with _condition:
+        if _stream_slots is None:
+            _stream_slots = threading.BoundedSemaphore(max_streams)
+    return _stream_slots.acquire(blocking=False)
+
+def release_stream():
+    _stream_slots.release()
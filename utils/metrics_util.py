@@ -0,0 +1,110 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, shared by every stage timer
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float('inf'))
+RUN_RECORDS_SIZE = 200
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_run_records = deque(maxlen=RUN_RECORDS_SIZE)
+
+# Name of the task the current thread/coroutine is working for, used as a label
+current_task = contextvars.ContextVar('current_task', default='adhoc')
+
+@contextmanager
+def task_context(task_name):
+    token = current_task.set(task_name)
+    try:
+        yield
+    finally:
+        current_task.reset(token)
+
+def observe(stage, seconds, task=None):
+    key = (task or current_task.get(), stage)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist['buckets'][i] += 1
+        hist['sum'] += seconds
+        hist['count'] += 1
+
+def inc(event, amount=1, task=None):
+    key = (task or current_task.get(), event)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+@contextmanager
+def timer(stage, task=None):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc(f'{stage}_errors', task=task)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, task=task)
+
+def record_run(task_name, status, started_at, duration, error=None):
+    with _lock:
+        _run_records.append({
+            'task': task_name,
+            'status': status,
+            'started_at': started_at.isoformat(),
+            'duration': round(duration, 3),
+            'error': error,
+        })
+
+def get_run_records(task_name=None):
+    with _lock:
+        records = list(_run_records)
+    if task_name:
+        records = [r for r in records if r['task'] == task_name]
+    return records
+
+def task_summary(task_name):
+    with _lock:
+        stages = {
+            stage: {'count': h['count'], 'total_seconds': round(h['sum'], 3),
+                    'avg_seconds': round(h['sum'] / h['count'], 3) if h['count'] else 0}
+            for (task, stage), h in _histograms.items() if task == task_name
+        }
+        counters = {event: value for (task, event), value in _counters.items() if task == task_name}
+    runs = get_run_records(task_name)
+    return {'stages': stages, 'counters': counters, 'last_run': runs[-1] if runs else None, 'recent_runs': runs[-10:]}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        lines.append('# HELP finespresso_stage_seconds Time spent per task stage')
+        lines.append('# TYPE finespresso_stage_seconds histogram')
+        for (task, stage), h in sorted(_histograms.items()):
+            for bound, count in zip(BUCKETS, h['buckets']):
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'finespresso_stage_seconds_bucket{{{_labels(task=task, stage=stage, le=le)}}} {count}')
+            lines.append(f'finespresso_stage_seconds_sum{{{_labels(task=task, stage=stage)}}} {h["sum"]}')
+            lines.append(f'finespresso_stage_seconds_count{{{_labels(task=task, stage=stage)}}} {h["count"]}')
+        lines.append('# HELP finespresso_events_total Counted events per task')
+        lines.append('# TYPE finespresso_events_total counter')
+        for (task, event), value in sorted(_counters.items()):
+            lines.append(f'finespresso_events_total{{{_labels(task=task, event=event)}}} {value}')
+        records = list(_run_records)
+    lines.append('# HELP finespresso_task_last_run_seconds Duration of the most recent run per task')
+    lines.append('# TYPE finespresso_task_last_run_seconds gauge')
+    last_runs = {r['task']: r for r in records}
+    for task, record in sorted(last_runs.items()):
+        lines.append(f'finespresso_task_last_run_seconds{{{_labels(task=task, status=record["status"])}}} {record["duration"]}')
+    return '\n'.join(lines) + '\n'
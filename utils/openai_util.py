@@ -2,6 +2,8 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 from gptcache import cache
+from utils.metrics_util import timer
+from utils.prompt_util import build_prompt_text, TAG_TOKEN_BUDGET, SUMMARY_TOKEN_BUDGET, TICKER_TOKEN_BUDGET
 
 load_dotenv()
 
@@ -13,29 +15,35 @@ cache.set_openai_key()
 
 model_name = "gpt-4o-mini"  # Updated model name
 
-def tag_news(news, tags):
+def tag_news(news, tags, publisher=None):
+    news = build_prompt_text(news, TAG_TOKEN_BUDGET, publisher)
     prompt = f'Answering with one tag only, pick up the best tag which describes the news "{news}" from the list: {tags}'
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=[{"role": "user", "content": prompt}]
-    )
+    with timer('llm_tag'):
+        response = client.chat.completions.create(
+            model=model_name,
+            messages=[{"role": "user", "content": prompt}]
+        )
     tag = response.choices[0].message.content
     return tag
 
-def summarize(news):
+def summarize(news, publisher=None):
+    news = build_prompt_text(news, SUMMARY_TOKEN_BUDGET, publisher)
     prompt = f'Summarize this in a brief, exciting way like a sports commentary (50 words or less): "{news}"'
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=[{"role": "user", "content": prompt}]
-    )
+    with timer('llm_summary'):
+        response = client.chat.completions.create(
+            model=model_name,
+            messages=[{"role": "user", "content": prompt}]
+        )
     summary = response.choices[0].message.content
     return summary
 
 def extract_ticker(news):
+    news = build_prompt_text(news, TICKER_TOKEN_BUDGET)
     prompt = f'Extract the company or issuer ticker/symbol from this news text. If multiple are present, return the most relevant one. If none are present, return "N/A". News: "{news}"'
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=[{"role": "user", "content": prompt}]
-    )
+    with timer('llm_ticker'):
+        response = client.chat.completions.create(
+            model=model_name,
+            messages=[{"role": "user", "content": prompt}]
+        )
     ticker = response.choices[0].message.content.strip()
     return ticker if ticker != "N/A" else None
\ No newline at end of file
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import cProfile
+import logging
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Opt-in profiling of task runs. A profiled run writes three files to PROFILE_DIR:
+#   <stem>.pstats     cProfile CPU time of the task's thread (thread_time), for pstats/snakeviz
+#   <stem>.collapsed  sampled wall-clock stacks of the task's thread and the threads it starts, for flamegraph.pl/speedscope
+#   <stem>.json       summary: durations, asyncio task breakdown, tracemalloc peak and top allocations
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 20))
+# Comma separated task names profiled on every run ('all' for every task)
+PROFILE_TASKS = {t.strip() for t in os.getenv('PROFILE_TASKS', '').split(',') if t.strip()}
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 25
+PROFILE_EXTENSIONS = ('.pstats', '.collapsed', '.json')
+
+_armed = set()
+_armed_lock = threading.Lock()
+# tracemalloc and the sampler are process-wide, so only one run is profiled at a time
+_active = threading.Lock()
+_thread_start = threading.Thread.start
+_sampler = None
+
+# Profile the next run of task_name only
+def arm(task_name):
+    with _armed_lock:
+        _armed.add(task_name)
+
+def should_profile(task_name):
+    with _armed_lock:
+        if task_name in _armed:
+            _armed.discard(task_name)
+            return True
+    return task_name in PROFILE_TASKS or 'all' in PROFILE_TASKS
+
+def frame_label(code):
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def collapse_stack(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+# While a run is profiled, threads started by the task (executor workers, asyncio.to_thread)
+# are added to the sampled set; threads the scheduler or web server start meanwhile are not
+def _start_and_track(thread):
+    _thread_start(thread)
+    sampler = _sampler
+    if sampler is not None and threading.get_ident() in sampler.thread_ids:
+        sampler.thread_ids.add(thread.ident)
+
+# Samples the running thread, plus any threads it starts, at a fixed interval
+class StackSampler(threading.Thread):
+    def __init__(self, target_thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.thread_ids = {target_thread_id}
+        self.stacks = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in self.thread_ids:
+                    continue
+                stack = collapse_stack(frame)
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        global _sampler
+        _thread_start(self)
+        _sampler = self
+        threading.Thread.start = _start_and_track
+
+    def stop(self):
+        global _sampler
+        threading.Thread.start = _thread_start
+        _sampler = None
+        self._stop_event.set()
+        self.join()
+
+# Records wall time per asyncio task through the loop's task factory
+class AsyncioTracker:
+    def __init__(self):
+        self.tasks = []
+
+    def factory(self, loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        record = {'coro': getattr(coro, '__qualname__', repr(coro)), 'started': time.perf_counter(), 'seconds': None}
+        self.tasks.append(record)
+        task.add_done_callback(lambda _: record.update(seconds=time.perf_counter() - record['started']))
+        return task
+
+    async def wrap(self, coro):
+        asyncio.get_running_loop().set_task_factory(self.factory)
+        return await coro
+
+    def summary(self, now):
+        grouped = {}
+        for record in self.tasks:
+            seconds = record['seconds'] if record['seconds'] is not None else now - record['started']
+            entry = grouped.setdefault(record['coro'], {'coro': record['coro'], 'count': 0, 'total_seconds': 0.0,
+                                                        'max_seconds': 0.0, 'unfinished': 0})
+            entry['count'] += 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            entry['unfinished'] += record['seconds'] is None
+        return sorted(grouped.values(), key=lambda e: e['total_seconds'], reverse=True)
+
+class Profiler:
+    def __init__(self, task_name):
+        self.task_name = task_name
+        self.started_at = datetime.now()
+        self.profile = cProfile.Profile(time.thread_time)
+        self.sampler = StackSampler(threading.get_ident())
+        self.asyncio = AsyncioTracker()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+
+    # Wrap a task coroutine so its asyncio tasks are tracked
+    def wrap(self, coro):
+        return self.asyncio.wrap(coro)
+
+    def start(self):
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+        self.wall_seconds = time.perf_counter() - self.wall_start
+        self.cpu_seconds = time.thread_time() - self.cpu_start
+        self.memory_current, self.memory_peak = tracemalloc.get_traced_memory()
+        self.snapshot = tracemalloc.take_snapshot()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+    def summary(self):
+        stats = pstats.Stats(self.profile)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        allocations = self.snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+        return {
+            'task': self.task_name,
+            'started_at': self.started_at.isoformat(),
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'samples': self.sampler.samples,
+            'sample_interval': self.sampler.interval,
+            'memory_peak_bytes': self.memory_peak,
+            'memory_current_bytes': self.memory_current,
+            'top_cumulative_cpu': [
+                {'function': f'{name} ({os.path.basename(filename)}:{line})', 'calls': nc, 'total_seconds': tt,
+                 'cumulative_seconds': ct}
+                for (filename, line, name), (cc, nc, tt, ct, callers) in functions
+            ],
+            'top_allocations': [
+                {'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+                for stat in allocations
+            ],
+            'asyncio_tasks': self.asyncio.summary(time.perf_counter()),
+        }
+
+    def save(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(PROFILE_DIR, f"{self.started_at:%Y%m%dT%H%M%S}_{self.task_name}")
+        self.profile.dump_stats(f'{stem}.pstats')
+        with open(f'{stem}.collapsed', 'w') as f:
+            for stack, count in sorted(self.sampler.stacks.items()):
+                f.write(f'{stack} {count}\n')
+        with open(f'{stem}.json', 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        prune()
+        logging.info(f"Saved {self.task_name} profile to {stem}.*")
+
+# Stand-in used when a run is not profiled
+class NullProfiler:
+    def wrap(self, coro):
+        return coro
+
+@contextmanager
+def profile_run(task_name):
+    if not should_profile(task_name):
+        yield NullProfiler()
+        return
+    if not _active.acquire(blocking=False):
+        logging.warning(f"Another run is being profiled, not profiling {task_name}")
+        yield NullProfiler()
+        return
+    try:
+        profiler = Profiler(task_name)
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            try:
+                profiler.save()
+            except Exception as e:
+                logging.error(f"Could not save {task_name} profile: {e}")
+    finally:
+        _active.release()
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    stems = sorted({os.path.splitext(name)[0] for name in os.listdir(PROFILE_DIR)
+                    if name.endswith(PROFILE_EXTENSIONS)}, reverse=True)
+    profiles = []
+    for stem in stems:
+        files = [stem + ext for ext in PROFILE_EXTENSIONS if os.path.exists(os.path.join(PROFILE_DIR, stem + ext))]
+        entry = {'name': stem, 'files': files}
+        if f'{stem}.json' in files:
+            with open(os.path.join(PROFILE_DIR, f'{stem}.json')) as f:
+                summary = json.load(f)
+            entry.update({k: summary.get(k) for k in ('task', 'started_at', 'wall_seconds', 'cpu_seconds', 'memory_peak_bytes')})
+        profiles.append(entry)
+    return profiles
+
+# Keep only the newest PROFILE_KEEP profiles
+def prune():
+    for entry in list_profiles()[PROFILE_KEEP:]:
+        for name in entry['files']:
+            os.remove(os.path.join(PROFILE_DIR, name))
@@ -0,0 +1,135 @@
+import re
+import time
+import logging
+from utils.db_util import get_recent_contents
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Token budgets for the article text interpolated into each prompt
+TAG_TOKEN_BUDGET = 300
+SUMMARY_TOKEN_BUDGET = 500
+TICKER_TOKEN_BUDGET = 150
+
+# A sentence is a publisher's boilerplate when it recurs in this share of its recent articles
+BOILERPLATE_SAMPLE_SIZE = 500
+BOILERPLATE_MIN_SHARE = 0.2
+BOILERPLATE_MIN_COUNT = 5
+BOILERPLATE_TTL = 24 * 3600
+
+# Boilerplate that is common across publishers, so it is dropped even before anything is learned
+STATIC_BOILERPLATE = [
+    # Cookie banners and notices, not news that merely mentions cookies
+    re.compile(r'\b(this (web)?site|we) uses? cookies\b|\bcookie (policy|settings|preferences|notice)\b|\baccept (all )?cookies\b', re.I),
+    re.compile(r'\bobliged to make public pursuant to\b', re.I),
+    re.compile(r'\bforward[- ]looking statements?\b', re.I),
+    re.compile(r'^\s*(disclaimer|important (information|notice))\b', re.I),
+    re.compile(r'\bnot for (release|publication|distribution)\b', re.I),
+    re.compile(r'^\s*for (further|more|additional) information\b', re.I),
+    # "About Acme Oyj:" section headings; case-sensitive so the name must be capitalised words
+    re.compile(r'^\s*(About|ABOUT) (the [Cc]ompany|[Uu]s|[A-Z][\w&.\-]*( [A-Z0-9&][\w&.\-]*){0,6})\s*[:\-]'),
+]
+
+_sentence_split = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]?[A-Z0-9])')
+_non_alnum = re.compile(r'[^0-9a-z]+')
+# Approximate tokens: punctuation, and words in pieces of up to four characters (about one BPE token each)
+_word = re.compile(r"\w{1,4}|[^\w\s]")
+_informative = re.compile(r'\d|%|\b(eur|sek|nok|dkk|usd|million|billion|mln|bn)\b', re.I)
+
+_encoding = None
+_encoding_failed = False
+_boilerplate = {}
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            # tiktoken downloads the encoding on first use, which fails without network access
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception as e:
+            logging.warning(f"Could not load tiktoken encoding, approximating token counts: {e}")
+            _encoding_failed = True
+    return _encoding
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Without tiktoken, approximate with short word pieces and punctuation
+    return len(_word.findall(text))
+
+def truncate_tokens(text, budget):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:budget])
+    pieces = _word.finditer(text)
+    end = 0
+    for i, match in enumerate(pieces):
+        if i >= budget:
+            break
+        end = match.end()
+    return text[:end]
+
+def split_sentences(text):
+    return [s.strip() for s in _sentence_split.split(text) if s.strip()]
+
+# Normalized form used to recognise the same sentence across releases
+def sentence_key(sentence):
+    return _non_alnum.sub(' ', sentence.lower()).strip()
+
+def learn_boilerplate(contents):
+    document_counts = {}
+    documents = 0
+    for content in contents:
+        if not content:
+            continue
+        documents += 1
+        for key in {sentence_key(s) for s in split_sentences(content)}:
+            document_counts[key] = document_counts.get(key, 0) + 1
+    threshold = max(BOILERPLATE_MIN_COUNT, BOILERPLATE_MIN_SHARE * documents)
+    return {key for key, count in document_counts.items() if count >= threshold}
+
+def get_boilerplate(publisher):
+    if not publisher:
+        return set()
+    cached = _boilerplate.get(publisher)
+    if cached is None or time.time() - cached[0] > BOILERPLATE_TTL:
+        try:
+            learned = learn_boilerplate(get_recent_contents(publisher, BOILERPLATE_SAMPLE_SIZE))
+            logging.info(f"Learned {len(learned)} boilerplate sentences for {publisher}")
+        except Exception as e:
+            logging.warning(f"Could not learn boilerplate for {publisher}: {e}")
+            learned = set()
+        cached = _boilerplate[publisher] = (time.time(), learned)
+    return cached[1]
+
+def is_boilerplate(sentence, learned):
+    return sentence_key(sentence) in learned or any(p.search(sentence) for p in STATIC_BOILERPLATE)
+
+def score_sentence(sentence, position):
+    # Figures and amounts carry most of the news in a release; earlier sentences break ties
+    return len(_informative.findall(sentence)) + 1 / (1 + position)
+
+# Article text for a prompt: boilerplate removed, then the highest scoring sentences
+# that fit in the token budget, kept in their original order.
+def build_prompt_text(text, budget, publisher=None):
+    if not text:
+        return text
+    learned = get_boilerplate(publisher)
+    sentences = [s for s in split_sentences(text) if not is_boilerplate(s, learned)] or split_sentences(text)
+    tokens = [count_tokens(s) for s in sentences]
+    if sum(tokens) <= budget:
+        return ' '.join(sentences)
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score_sentence(sentences[i], i), reverse=True)
+    chosen = []
+    used = 0
+    for i in ranked:
+        if used + tokens[i] <= budget:
+            chosen.append(i)
+            used += tokens[i]
+    if not chosen:
+        return truncate_tokens(sentences[ranked[0]], budget)
+    return ' '.join(sentences[i] for i in sorted(chosen))
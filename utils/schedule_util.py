@@ -0,0 +1,143 @@
+import os
+import logging
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from utils.db_util import count_recent_news
+
+# Trading hours and exchange holidays per source, in exchange local time. Holidays are fixed
+# (month, day) dates, days relative to Easter Sunday, and Midsummer Eve (the Friday between June 19 and 25).
+# Days with an early close (e.g. Euronext on Dec 24 and 31) count as trading days.
+MARKETS = {
+    'omx': {
+        'timezone': 'Europe/Stockholm', 'open': time(9, 0), 'close': time(17, 30),
+        # Nasdaq Stockholm: Epiphany, Ascension Day, National Day, Midsummer Eve, Christmas and New Year's Eve
+        'holidays': {'fixed': {(1, 1), (1, 6), (5, 1), (6, 6), (12, 24), (12, 25), (12, 26), (12, 31)},
+                     'easter': (-2, 1, 39), 'midsummer_eve': True},
+    },
+    'euronext': {
+        'timezone': 'Europe/Paris', 'open': time(9, 0), 'close': time(17, 30),
+        'holidays': {'fixed': {(1, 1), (5, 1), (12, 25), (12, 26)}, 'easter': (-2, 1)},
+    },
+    'baltics': {
+        'timezone': 'Europe/Tallinn', 'open': time(10, 0), 'close': time(16, 0),
+        # Nasdaq Tallinn: Independence Day, Victory Day, Midsummer Day and Restoration of Independence
+        'holidays': {'fixed': {(1, 1), (2, 24), (5, 1), (6, 23), (6, 24), (8, 20), (12, 24), (12, 25), (12, 26), (12, 31)},
+                     'easter': (-2, 1)},
+    },
+}
+
+# Releases cluster just before the open and after the close, so those count as busy
+PRE_OPEN = timedelta(hours=2)
+POST_CLOSE = timedelta(hours=1)
+
+# Poll interval bounds and the number of new items we aim to pick up per poll.
+# Bounds can be overridden with <SOURCE>_MIN_POLL_MINUTES / <SOURCE>_MAX_POLL_MINUTES.
+SOURCE_POLICIES = {
+    'omx': {'min_minutes': 10, 'max_minutes': 180, 'target_items': 5},
+    'euronext': {'min_minutes': 10, 'max_minutes': 180, 'target_items': 5},
+    'baltics': {'min_minutes': 15, 'max_minutes': 360, 'target_items': 5},
+}
+RATE_WINDOW = timedelta(hours=6)
+
+def easter(year):
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+@lru_cache(maxsize=None)
+def market_holidays(source, year):
+    rules = MARKETS[source]['holidays']
+    days = {date(year, month, day) for month, day in rules['fixed']}
+    sunday = easter(year)
+    days.update(sunday + timedelta(days=offset) for offset in rules.get('easter', ()))
+    if rules.get('midsummer_eve'):
+        june_19 = date(year, 6, 19)
+        days.add(june_19 + timedelta(days=(4 - june_19.weekday()) % 7))
+    return frozenset(days)
+
+def is_trading_day(source, day):
+    return day.weekday() < 5 and day not in market_holidays(source, day.year)
+
+def get_policy(source):
+    policy = dict(SOURCE_POLICIES[source])
+    for bound in ('min_minutes', 'max_minutes'):
+        override = os.getenv(f"{source.upper()}_{bound.split('_')[0].upper()}_POLL_MINUTES")
+        if override:
+            policy[bound] = int(override)
+    return policy
+
+# Start of the next busy window (pre-open on a trading day) after `now`
+def next_session_start(source, now):
+    market = MARKETS[source]
+    local = now.astimezone(ZoneInfo(market['timezone']))
+    day = local.date()
+    while True:
+        opens = datetime.combine(day, market['open'], tzinfo=local.tzinfo) - PRE_OPEN
+        if is_trading_day(source, day) and opens > local:
+            return opens.astimezone(timezone.utc)
+        day += timedelta(days=1)
+
+def market_phase(source, now):
+    market = MARKETS[source]
+    local = now.astimezone(ZoneInfo(market['timezone']))
+    if not is_trading_day(source, local.date()):
+        return 'closed'
+    opens = datetime.combine(local.date(), market['open'], tzinfo=local.tzinfo)
+    closes = datetime.combine(local.date(), market['close'], tzinfo=local.tzinfo)
+    if opens - PRE_OPEN <= local < opens:
+        return 'pre_open'
+    if opens <= local < closes:
+        return 'open'
+    if closes <= local < closes + POST_CLOSE:
+        return 'post_close'
+    return 'overnight'
+
+# Items per hour published by the source recently
+def observed_rate(source, now):
+    try:
+        return count_recent_news(source, now - RATE_WINDOW) / (RATE_WINDOW.total_seconds() / 3600)
+    except Exception as e:
+        logging.warning(f"Could not compute item rate for {source}: {e}")
+        return None
+
+# Choose when a source should next be polled; returns (run_at, reason).
+# max_hours (the task's configured frequency) caps the interval while the market is busy;
+# closed and overnight phases always use the source's max_minutes.
+def next_run(source, now=None, max_hours=None):
+    now = now or datetime.now(timezone.utc)
+    policy = get_policy(source)
+    min_interval = timedelta(minutes=policy['min_minutes'])
+    idle_interval = max(min_interval, timedelta(minutes=policy['max_minutes']))
+    max_interval = idle_interval
+    if max_hours:
+        max_interval = max(min_interval, min(max_interval, timedelta(hours=max_hours)))
+
+    phase = market_phase(source, now)
+    if phase in ('closed', 'overnight'):
+        # Poll at the upper bound, but never sleep through the next pre-open window
+        session = next_session_start(source, now)
+        run_at = min(now + idle_interval, max(session, now + min_interval))
+        reason = f"market {phase}, next busy window at {session:%Y-%m-%d %H:%M} UTC"
+    elif phase == 'pre_open':
+        run_at = now + min_interval
+        reason = "pre-open release window"
+    else:
+        rate = observed_rate(source, now)
+        if rate:
+            interval = timedelta(hours=policy['target_items'] / rate)
+            interval = max(min_interval, min(max_interval, interval))
+            reason = f"market {phase}, {rate:.1f} items/h observed"
+        else:
+            interval = max_interval
+            reason = f"market {phase}, no recent items"
+        run_at = now + interval
+    return run_at, reason
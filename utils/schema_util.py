@@ -0,0 +1,144 @@
+import logging
+from datetime import date, datetime, timezone
+from sqlalchemy import MetaData, Table, Column, Index, inspect, text
+
+# Postgres declarative partitioning of a table by month on a timestamp column.
+# Partitions are named <table>_pYYYYMM; a <table>_default partition catches
+# anything outside the created ranges. Other databases keep a plain table.
+
+def month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def partition_name(table_name, month):
+    return f'{table_name}_p{month:%Y%m}'
+
+def supports_partitioning(engine):
+    return engine.dialect.name == 'postgresql'
+
+def is_partitioned(engine, table_name):
+    if not supports_partitioning(engine):
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text(
+            'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name'
+        ), {'name': table_name}).first() is not None
+
+# Copy of a mapped table whose primary key also includes the partition key,
+# as Postgres requires, partitioned by range on that key.
+def partitioned_copy(table, partition_key):
+    metadata = MetaData()
+    columns = []
+    for column in table.columns:
+        is_key = column.primary_key or column.name == partition_key
+        columns.append(Column(
+            column.name, column.type,
+            primary_key=is_key,
+            nullable=not is_key and column.nullable,
+            autoincrement=bool(column.primary_key and column.autoincrement),
+        ))
+    copy = Table(table.name, metadata, *columns, postgresql_partition_by=f'RANGE ({partition_key})')
+    for index in table.indexes:
+        Index(index.name, *[copy.c[c.name] for c in index.columns], unique=index.unique, **index.dialect_kwargs)
+    return copy
+
+def create_partitioned_table(engine, table, partition_key, months_ahead):
+    copy = partitioned_copy(table, partition_key)
+    copy.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS {table.name}_default PARTITION OF {table.name} DEFAULT'))
+    ensure_partitions(engine, table.name, months_ahead)
+    logging.info(f"Created {table.name} partitioned by month on {partition_key}")
+
+def ensure_partitions(engine, table_name, months_ahead, start=None):
+    today = datetime.now(timezone.utc).date()
+    first = month_start(start or today)
+    last = month_start(today, months_ahead)
+    created = []
+    month = first
+    with engine.begin() as conn:
+        while month <= last:
+            name = partition_name(table_name, month)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+            month = month_start(month, 1)
+    return created
+
+def list_partitions(engine, table_name):
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = :name ORDER BY c.relname'
+        ), {'name': table_name}).all()
+    return [row[0] for row in rows]
+
+# Detach monthly partitions that end before the cutoff month. Detached partitions
+# stay as standalone tables (the archive) unless drop is set.
+def detach_old_partitions(engine, table_name, cutoff, drop=False):
+    prefix = f'{table_name}_p'
+    detached = []
+    for name in list_partitions(engine, table_name):
+        if not name.startswith(prefix):
+            continue
+        month = datetime.strptime(name[len(prefix):], '%Y%m').date()
+        if month_start(month, 1) > cutoff:
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table_name} DETACH PARTITION {name}'))
+            if drop:
+                conn.execute(text(f'DROP TABLE {name}'))
+        logging.info(f"{'Dropped' if drop else 'Detached'} partition {name}")
+        detached.append(name)
+    return detached
+
+# Plain-table fallback: move rows older than the cutoff into <table>_archive. Columns are
+# listed by name, and ones added to the live table since the archive was created are added to it first.
+def archive_old_rows(engine, table, partition_key, cutoff, drop=False):
+    name = table.name
+    archive = f'{name}_archive'
+    columns = ', '.join(c.name for c in table.columns)
+    with engine.begin() as conn:
+        if not drop:
+            if not inspect(conn).has_table(archive):
+                conn.execute(text(f'CREATE TABLE {archive} AS SELECT {columns} FROM {name} WHERE 1 = 0'))
+            existing = {c['name'] for c in inspect(conn).get_columns(archive)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {archive} ADD COLUMN {column.name} {column_type}'))
+                    logging.info(f"Added column {archive}.{column.name}")
+            conn.execute(text(f'INSERT INTO {archive} ({columns}) SELECT {columns} FROM {name} '
+                              f'WHERE {partition_key} < :cutoff'), {'cutoff': cutoff})
+        result = conn.execute(text(f'DELETE FROM {name} WHERE {partition_key} < :cutoff'), {'cutoff': cutoff})
+    logging.info(f"{'Deleted' if drop else 'Archived'} {result.rowcount} rows from {name} older than {cutoff}")
+    return result.rowcount
+
+# Rebuild an existing plain Postgres table as a partitioned one. The old table is
+# kept as <table>_unpartitioned until it is dropped by hand.
+def convert_to_partitioned(engine, table, partition_key, months_ahead):
+    name = table.name
+    old = f'{name}_unpartitioned'
+    columns = ', '.join(c.name for c in table.columns)
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {name} RENAME TO {old}'))
+        conn.execute(text(f'ALTER TABLE {old} RENAME CONSTRAINT {name}_pkey TO {old}_pkey'))
+        conn.execute(text(f'ALTER SEQUENCE IF EXISTS {name}_id_seq RENAME TO {old}_id_seq'))
+        # Index names are schema-wide, so the old table's copies must go first
+        for index in table.indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        first = conn.execute(text(f'SELECT MIN({partition_key}) FROM {old}')).scalar()
+
+    create_partitioned_table(engine, table, partition_key, months_ahead)
+    if first is not None:
+        ensure_partitions(engine, name, months_ahead, start=first.date())
+
+    selected = ', '.join(f'COALESCE({c.name}, now())' if c.name == partition_key else c.name for c in table.columns)
+    with engine.begin() as conn:
+        result = conn.execute(text(f'INSERT INTO {name} ({columns}) SELECT {selected} FROM {old}'))
+        conn.execute(text(f"SELECT setval('{name}_id_seq', (SELECT COALESCE(MAX(id), 1) FROM {name}))"))
+    logging.info(f"Copied {result.rowcount} rows from {old} into partitioned {name}")
+    return result.rowcount
@@ -0,0 +1,117 @@
+import re
+import logging
+import pandas as pd
+from utils.tag_util import tag_list
+
+# A learned mapping is only trusted once a publisher topic has been tagged
+# often enough, and consistently enough, by the LLM.
+MIN_SUPPORT = 25
+MIN_SHARE = 0.9
+
+# Curated publisher topic -> AI topic mapping, keyed by normalized topic
+EXACT_RULES = {
+    'financial calendar': 'financial_calendar',
+    'calendar of events': 'calendar_of_events',
+    'annual report': 'annual_report',
+    'annual financial and audit reports': 'annual_report',
+    'interim report q1 and q3': 'financial_results',
+    'half year financial report': 'financial_results',
+    'half year financial reports and audit reports limited reviews': 'financial_results',
+    'quarterly financial report': 'financial_results',
+    'notice to general meeting': 'annual_general_meeting',
+    'result of general meeting': 'annual_general_meeting',
+    'total number of voting rights and capital': 'voting_rights',
+    'changes in board management auditors': 'management_change',
+    'exchange announcement': 'exchange_announcement',
+    'net asset value': 'fund_data_announcement',
+    'ex dividend date': 'ex_dividend_date',
+    'bond fixing': 'bond_fixing',
+}
+
+# Fallback patterns tried in order against the normalized topic
+REGEX_RULES = [
+    (re.compile(r'\bfinancial calendar\b'), 'financial_calendar'),
+    (re.compile(r'\b(interim|quarterly|half year|halfyear)\b.*\breports?\b'), 'financial_results'),
+    (re.compile(r'\bannual (financial )?reports?\b'), 'annual_report'),
+    (re.compile(r'\b(notice|results?) (of|to) (the )?(annual |extraordinary )?general meeting\b'), 'annual_general_meeting'),
+    (re.compile(r'\bvoting rights\b'), 'voting_rights'),
+    (re.compile(r'\bex dividend\b'), 'ex_dividend_date'),
+    (re.compile(r'\bnet asset values?\b'), 'fund_data_announcement'),
+    (re.compile(r'\binitial public offering\b'), 'initial_public_offering'),
+]
+
+_non_alnum = re.compile(r'[^0-9a-z]+')
+
+def normalize_topic(topic):
+    if topic is None or (isinstance(topic, float) and pd.isna(topic)):
+        return ''
+    return _non_alnum.sub(' ', str(topic).lower()).strip()
+
+def normalize_tag(tag):
+    tag = normalize_topic(tag).replace(' ', '_')
+    return tag if tag in tag_list else None
+
+# Build a mapping index from (publisher, publisher_topic, industry, ai_topic, count) rows
+def build_topic_index(cooccurrence=()):
+    counts = {}
+    for publisher, publisher_topic, industry, ai_topic, count in cooccurrence:
+        tag = normalize_tag(ai_topic)
+        topic = normalize_topic(publisher_topic)
+        if not tag or not topic:
+            continue
+        keys = [(publisher, topic, None)]
+        if industry:
+            keys.append((publisher, topic, normalize_topic(industry)))
+        for key in keys:
+            tag_counts = counts.setdefault(key, {})
+            tag_counts[tag] = tag_counts.get(tag, 0) + count
+
+    learned = {}
+    for key, tag_counts in counts.items():
+        total = sum(tag_counts.values())
+        tag, best = max(tag_counts.items(), key=lambda kv: kv[1])
+        if total >= MIN_SUPPORT and best / total >= MIN_SHARE:
+            learned[key] = tag
+
+    logging.info(f"Built topic index with {len(learned)} learned rules")
+    return {'exact': EXACT_RULES, 'learned': learned, 'regex': REGEX_RULES}
+
+def resolve_topic(index, publisher, publisher_topic, industry=None):
+    topic = normalize_topic(publisher_topic)
+    if not topic:
+        return None
+    if topic in index['exact']:
+        return index['exact'][topic]
+    learned = index['learned']
+    industry = normalize_topic(industry)
+    if industry and (publisher, topic, industry) in learned:
+        return learned[(publisher, topic, industry)]
+    if (publisher, topic, None) in learned:
+        return learned[(publisher, topic, None)]
+    for pattern, tag in index['regex']:
+        if pattern.search(topic):
+            return tag
+    return None
+
+# Resolve AI topics for a whole DataFrame, evaluating each distinct key once
+def resolve_topics(df, index):
+    if df.empty or 'publisher_topic' not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+
+    industry = df['industry'] if 'industry' in df.columns else pd.Series('', index=df.index)
+    keys = pd.DataFrame({
+        'publisher': df['publisher'],
+        'publisher_topic': df['publisher_topic'].fillna(''),
+        'industry': industry.fillna(''),
+    })
+    unique_keys = keys.drop_duplicates()
+    resolved = {
+        (row.publisher, row.publisher_topic, row.industry): resolve_topic(index, row.publisher, row.publisher_topic, row.industry)
+        for row in unique_keys.itertuples(index=False)
+    }
+    topics = pd.Series(
+        [resolved[key] for key in zip(keys['publisher'], keys['publisher_topic'], keys['industry'])],
+        index=df.index, dtype=object
+    )
+    logging.info(f"Resolved AI topic for {topics.notna().sum()}/{len(topics)} rows from publisher topics")
+    return topics
@@ -1,19 +1,38 @@
 import requests
 from dotenv import load_dotenv
 import os
+import hashlib
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.metrics_util import timer, inc
 
 load_dotenv()
 
 API_KEY = os.getenv('ELEVENLABS_API_KEY')
-# ElevenLabs API endpoint
-URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-
-# Your ElevenLabs API key
+# ElevenLabs API endpoint; ELEVENLABS_URL points it at a local stub for testing
+BASE_URL = os.getenv('ELEVENLABS_URL', 'https://api.elevenlabs.io').rstrip('/')
+URL = BASE_URL + "/v1/text-to-speech/{voice_id}"
 
 # The ID of the voice you want to use
 VOICE_ID = "Xb7hH8MSUJpSbSDYk0k2"
+MODEL_ID = "eleven_monolingual_v1"
+
+# Rendered audio is stored as <MEDIA_DIR>/<content hash>.mp3, so each text is synthesized once
+MEDIA_DIR = os.getenv('MEDIA_DIR', 'data/audio')
+TTS_TIMEOUT = 60
+TTS_MAX_WORKERS = int(os.getenv('TTS_MAX_WORKERS', 4))
+CHUNK_SIZE = 16 * 1024
+
+def audio_hash(text, voice_id=VOICE_ID):
+    return hashlib.sha256(f'{voice_id}\0{MODEL_ID}\0{text}'.encode('utf-8')).hexdigest()
 
-def text_to_speech(text, output_path="media/voice_test.mp3"):
+def audio_path(text, voice_id=VOICE_ID):
+    return os.path.join(MEDIA_DIR, f'{audio_hash(text, voice_id)}.mp3')
+
+# Stream the synthesized audio to output_path; returns the path, or None on failure
+def text_to_speech(text, output_path=None, voice_id=VOICE_ID):
+    output_path = output_path or audio_path(text, voice_id)
     headers = {
         "Accept": "audio/mpeg",
         "Content-Type": "application/json",
@@ -22,23 +41,66 @@ def text_to_speech(text, output_path="media/voice_test.mp3"):
 
     data = {
         "text": text,
-        "model_id": "eleven_monolingual_v1",
+        "model_id": MODEL_ID,
         "voice_settings": {
             "stability": 0.5,
             "similarity_boost": 0.5
         }
     }
 
-    response = requests.post(URL.format(voice_id=VOICE_ID), json=data, headers=headers)
+    partial_path = f'{output_path}.part'
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with timer('tts'):
+            with requests.post(URL.format(voice_id=voice_id), json=data, headers=headers, stream=True, timeout=TTS_TIMEOUT) as response:
+                if response.status_code != 200:
+                    logging.error(f"Error: {response.status_code} - {response.text}")
+                    return None
+                with open(partial_path, "wb") as audio_file:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        audio_file.write(chunk)
+        # Only complete files get the final name, so an existing hash always means finished audio
+        os.replace(partial_path, output_path)
+    # OSError (full disk, unwritable MEDIA_DIR) fails this text only, not the rest of the batch
+    except (requests.RequestException, OSError) as e:
+        logging.error(f"Error synthesizing audio: {e}")
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        return None
+    logging.info(f"Audio saved to {output_path}")
+    return output_path
+
+# Synthesize a batch of texts concurrently; returns {text: path} for every text with audio
+def render_audio(texts, max_workers=TTS_MAX_WORKERS, voice_id=VOICE_ID):
+    paths = {}
+    pending = []
+    for text in dict.fromkeys(t for t in texts if t):
+        path = audio_path(text, voice_id)
+        if os.path.exists(path):
+            paths[text] = path
+        else:
+            pending.append(text)
+    inc('audio_cached', len(paths))
 
-    if response.status_code == 200:
-        with open(output_path, "wb") as audio_file:
-            audio_file.write(response.content)
-        print(f"Audio saved to {output_path}")
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Pool threads don't inherit context variables, so carry the task label over for metrics
+            futures = {
+                executor.submit(contextvars.copy_context().run, text_to_speech, text, None, voice_id): text
+                for text in pending
+            }
+            for future in as_completed(futures):
+                path = future.result()
+                if path:
+                    paths[futures[future]] = path
+                    inc('audio_rendered')
+                else:
+                    inc('audio_errors')
+    return paths
 
 # Example usage
 if __name__ == "__main__":
     text = "Hello, this is a test of the ElevenLabs text-to-speech API."
-    text_to_speech(text)
\ No newline at end of file
+    text_to_speech(text, "media/voice_test.mp3")
@@ -1,15 +1,53 @@
 import requests
 from bs4 import BeautifulSoup
+from utils.metrics_util import timer, inc
+from utils import archive_util
 
-def fetch_url_content(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+# Prompts are cut to a token budget in utils/prompt_util, so keep enough text to choose from
+CONTENT_CHAR_LIMIT = 4000
+# Seconds to wait for a publisher to connect / send data; a timeout counts as a transient failure
+FETCH_TIMEOUT = (10, 30)
+
+def extract_text(html):
+    with timer('parse'):
+        soup = BeautifulSoup(html, 'html.parser')
         # Extract text from paragraphs, removing any scripts or styles
         for script in soup(["script", "style"]):
             script.decompose()
         text = ' '.join([p.get_text() for p in soup.find_all('p')])
-        return text[:1000]  # Return first 1000 characters
-    except requests.RequestException:
-        return "Failed to fetch content"
\ No newline at end of file
+    return text[:CONTENT_CHAR_LIMIT]  # Return first CONTENT_CHAR_LIMIT characters
+
+# Raw page body for a URL, served from the local archive when it was fetched before
+def fetch_page(url):
+    archived = archive_util.get(url)
+    if archived is not None:
+        inc('archive_hits')
+        return archived
+    with timer('fetch'):
+        response = requests.get(url, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+    archive_util.put(url, response.content, response.status_code, response.headers.get('Content-Type'))
+    inc('archive_misses')
+    return response.content
+
+# Client errors other than timeouts and rate limits mean the page is gone for good
+TRANSIENT_STATUS_CODES = {408, 425, 429}
+
+class FetchError(Exception):
+    # permanent: retrying will not help (4xx response, page without text)
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+def fetch_url_content(url):
+    try:
+        text = extract_text(fetch_page(url))
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        permanent = status is not None and 400 <= status < 500 and status not in TRANSIENT_STATUS_CODES
+        raise FetchError(f"Failed to fetch content: {e}", permanent) from e
+    except requests.RequestException as e:
+        raise FetchError(f"Failed to fetch content: {e}") from e
+    if not text.strip():
+        raise FetchError("No paragraph text found", permanent=True)
+    return text